@@ -1,9 +1,11 @@
 from .calibration import calibrate
 from .denoising import denoise
 from .differentiation import differentiate
+from .events import events
 from .impulses import impulses
 from .io import load_study, save_study
 from .logging import log
+from .microsaccades import microsaccades
 from .models import Protocol, Session, Study, Test, TestType
 from .reports import saccadic_report
 from .stimuli import pursuit_stimuli, saccadic_stimuli
@@ -17,9 +19,11 @@ __all__ = [
     "calibrate",
     "denoise",
     "differentiate",
+    "events",
     "impulses",
     "load_study",
     "log",
+    "microsaccades",
     "pursuit_stimuli",
     "saccadic_report",
     "saccadic_stimuli",
@@ -0,0 +1,174 @@
+"""Stimulus and channel alignment
+
+Acquisition and stimulation do not start exactly at the same time, so every
+test carries a lag between its stimuli and its channels. The lag is estimated
+with an FFT cross-correlation between the changes of the stimulus and the
+absolute velocity of the channel (so the polarity of the electrodes does not
+matter), both smoothed. The changes are taken from ``transitions``, so only
+tests with saccadic stimuli (ALIGNED_TYPES) are aligned. The peak of the
+correlation is the delay between every stimulus change and the response of the
+subject, so it includes the latency of the saccades. Peaks at the edges of the
+search or with a low correlation are rejected and the test is left as is. The
+applied shift is a view of the original arrays, kept in the test and saved in
+the manifest.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy import fft
+from scipy.ndimage import gaussian_filter1d
+
+from .denoising import denoise_35
+from .differentiation import differentiate
+from .logging import log
+from .models import Study, Test, TestType
+from .stimuli import transitions
+
+# Pruebas con estímulos sacádicos en las que se ha comprobado la estimación
+ALIGNED_TYPES = (TestType.HorizontalSaccadic, TestType.HorizontalAntisaccadic)
+
+
+def estimate_lag(
+    test: Test,
+    max_lag: int = 1000,
+    min_correlation: float = 0.2,
+    sigma: float = 10.0,
+) -> int | None:
+    """Estimate the lag of the horizontal channel with respect to the stimuli
+
+    The channel can only follow the stimuli, so negative lags are not searched.
+
+    Args:
+        test (Test): Test with a saccadic stimulus
+        max_lag (int, optional): Maximum lag searched (in samples).
+            Defaults to 1000.
+        min_correlation (float, optional): Minimum normalised correlation of
+            the peak. Defaults to 0.2.
+        sigma (float, optional): Standard deviation of the Gaussian smoothing
+            of the stimulus changes and the channel velocity (in samples).
+            Defaults to 10.0.
+
+    Returns:
+        int | None: Lag (in samples), None when it can not be estimated
+    """
+    stimuli = np.asarray(test.hor_stimuli_raw, dtype=np.float64)
+    channel = np.asarray(test.hor_channel_raw, dtype=np.float64)
+    length = min(len(stimuli), len(channel))
+    max_lag = min(max_lag, length - 1)
+
+    changes, _ = transitions(stimuli[:length])
+    if len(changes) == 0 or max_lag < 2:
+        return None
+
+    stimuli_changes = np.zeros(length)
+    stimuli_changes[changes] = 1.0
+    stimuli_changes = gaussian_filter1d(stimuli_changes, sigma)
+    channel_velocity = gaussian_filter1d(
+        abs(differentiate(denoise_35(channel[:length]))), sigma
+    )
+
+    reference = stimuli_changes - stimuli_changes.mean()
+    response = channel_velocity - channel_velocity.mean()
+    norm = np.linalg.norm(reference) * np.linalg.norm(response)
+    if norm == 0:
+        return None
+
+    n = fft.next_fast_len(2 * length)
+    spectrum = fft.rfft(response, n) * np.conj(fft.rfft(reference, n))
+    correlation = fft.irfft(spectrum, n)[: max_lag + 1] / norm
+
+    lag = int(correlation.argmax())
+    # Un máximo en el borde de la búsqueda no es un pico
+    if lag in (0, max_lag) or correlation[lag] < min_correlation:
+        return None
+
+    return lag
+
+
+def align_test(
+    test: Test,
+    max_lag: int = 1000,
+    min_correlation: float = 0.2,
+) -> int:
+    """Estimate the lag of the test and shift its channels to remove it
+
+    Tests of other types than ALIGNED_TYPES and tests whose lag can not be
+    estimated are left as they are.
+
+    Args:
+        test (Test): Test
+        max_lag (int, optional): Maximum lag searched (in samples).
+            Defaults to 1000.
+        min_correlation (float, optional): Minimum normalised correlation of
+            the peak. Defaults to 0.2.
+
+    Returns:
+        int: Applied shift (in samples)
+    """
+    if test.test_type not in ALIGNED_TYPES:
+        return 0
+
+    lag = estimate_lag(test, max_lag, min_correlation)
+    if lag is None:
+        log.warning(f"Could not estimate the lag of a {test.test_type.value} test")
+        return 0
+
+    test.apply_shift(lag)
+    return lag
+
+
+def align_study(
+    study: Study,
+    max_lag: int = 1000,
+    min_correlation: float = 0.2,
+) -> list[int]:
+    """Align the tests of the study
+
+    Args:
+        study (Study): Study
+        max_lag (int, optional): Maximum lag searched (in samples).
+            Defaults to 1000.
+        min_correlation (float, optional): Minimum normalised correlation of
+            the peak. Defaults to 0.2.
+
+    Returns:
+        list[int]: Applied shift of every test (0 for the tests left as is)
+    """
+    return [align_test(test, max_lag, min_correlation) for test in study]
+
+
+def align_studies(
+    studies: list[Study],
+    max_lag: int = 1000,
+    min_correlation: float = 0.2,
+    workers: int | None = None,
+) -> list[list[int]]:
+    """Align the tests of a cohort in parallel
+
+    Args:
+        studies (list[Study]): Studies
+        max_lag (int, optional): Maximum lag searched (in samples).
+            Defaults to 1000.
+        min_correlation (float, optional): Minimum normalised correlation of
+            the peak. Defaults to 0.2.
+        workers (int | None, optional): Number of threads. Defaults to None.
+
+    Returns:
+        list[list[int]]: Applied shift of every test of every study (0 for
+            the tests left as is)
+    """
+    tests = [test for study in studies for test in study]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        lags = list(
+            executor.map(lambda test: align_test(test, max_lag, min_correlation), tests)
+        )
+
+    result = []
+    position = 0
+    for study in studies:
+        result.append(lags[position : position + len(study)])
+        position += len(study)
+
+    return result
@@ -0,0 +1,383 @@
+"""Per-sample boundary walking kernels
+
+The detectors need to walk from a seed sample to the boundaries of an event one
+sample at a time, something NumPy can not express as a single array operation.
+This module keeps the reference pure Python implementation of those walks and,
+when Numba is installed, a JIT compiled version of the very same code. Kernels
+that have an equivalent array formulation use it in the Python backend, while
+the reference backend always runs the plain loops (to check the others). The
+active implementation is selected with ``set_backend`` (or with the
+``OPENEOG_BACKEND`` environment variable) and every kernel works over a batch of
+seeds so the dispatch cost is paid once per channel.
+"""
+
+from os import environ
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # pragma: no cover
+    numba = None
+
+REFERENCE = "reference"
+PYTHON = "python"
+NUMBA = "numba"
+AUTO = "auto"
+
+
+def _climb_peaks(vel_channel: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    result = np.empty(len(positions), dtype=np.int64)
+    max_position = len(vel_channel) - 1
+    for idx in range(len(positions)):
+        position = positions[idx]
+        while position > 0 and position < max_position:
+            current_value = vel_channel[position]
+            left_value = vel_channel[position - 1]
+            right_value = vel_channel[position + 1]
+            if left_value > right_value > current_value:
+                position -= 1
+            elif right_value > left_value > current_value:
+                position += 1
+            else:
+                break
+        result[idx] = position
+    return result
+
+
+def _peak_ranges(
+    vel_channel: np.ndarray,
+    positions: np.ndarray,
+    threshold: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    lefts = np.empty(len(positions), dtype=np.int64)
+    rights = np.empty(len(positions), dtype=np.int64)
+    max_position = len(vel_channel) - 1
+    for idx in range(len(positions)):
+        left = positions[idx] - 1
+        while left > 0 and vel_channel[left - 1] > threshold:
+            left -= 1
+
+        right = positions[idx] + 1
+        while right < max_position and vel_channel[right + 1] < threshold:
+            right += 1
+
+        lefts[idx] = left
+        rights[idx] = right
+    return lefts, rights
+
+
+def _threshold_ranges(
+    channel: np.ndarray,
+    positions: np.ndarray,
+    threshold: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    onsets = np.empty(len(positions), dtype=np.int64)
+    offsets = np.empty(len(positions), dtype=np.int64)
+    max_position = len(channel) - 1
+    for idx in range(len(positions)):
+        onset = positions[idx]
+        while onset > 0 and channel[onset - 1] >= threshold:
+            onset -= 1
+
+        offset = positions[idx]
+        while offset < max_position and channel[offset + 1] >= threshold:
+            offset += 1
+
+        onsets[idx] = onset
+        offsets[idx] = offset
+    return onsets, offsets
+
+
+def _descend_slopes(
+    channel: np.ndarray,
+    onsets: np.ndarray,
+    offsets: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    new_onsets = np.empty(len(onsets), dtype=np.int64)
+    new_offsets = np.empty(len(offsets), dtype=np.int64)
+    max_position = len(channel) - 1
+    for idx in range(len(onsets)):
+        onset = onsets[idx]
+        while onset > 0 and channel[onset] > channel[onset - 1]:
+            onset -= 1
+
+        offset = offsets[idx]
+        while offset < max_position and channel[offset] > channel[offset + 1]:
+            offset += 1
+
+        new_onsets[idx] = onset
+        new_offsets[idx] = offset
+    return new_onsets, new_offsets
+
+
+def _climb_peaks_numpy(vel_channel: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    # Todas las posiciones suben a la vez, una muestra por iteración
+    positions = positions.copy()
+    max_position = len(vel_channel) - 1
+    active = np.flatnonzero((positions > 0) & (positions < max_position))
+    while len(active):
+        position = positions[active]
+        current_value = vel_channel[position]
+        left_value = vel_channel[position - 1]
+        right_value = vel_channel[position + 1]
+
+        step = np.zeros(len(active), dtype=np.int64)
+        step[(left_value > right_value) & (right_value > current_value)] = -1
+        step[(right_value > left_value) & (left_value > current_value)] = 1
+
+        position += step
+        positions[active] = position
+        active = active[(step != 0) & (position > 0) & (position < max_position)]
+
+    return positions
+
+
+def _peak_ranges_numpy(
+    vel_channel: np.ndarray,
+    positions: np.ndarray,
+    threshold: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    samples = len(vel_channel)
+    max_position = samples - 1
+    indexes = np.arange(samples)
+
+    # Última muestra que no supera el umbral hasta cada posición y primera que
+    # lo alcanza a partir de cada posición
+    last_below = np.where(~(vel_channel > threshold), indexes, -1)
+    last_below = np.maximum.accumulate(last_below)
+    next_above = np.where(~(vel_channel < threshold), indexes, samples)
+    next_above = np.minimum.accumulate(next_above[::-1])[::-1]
+
+    lefts = positions - 1
+    walk = lefts > 0
+    lefts[walk] = last_below[positions[walk] - 2] + 1
+
+    rights = positions + 1
+    walk = rights < max_position
+    rights[walk] = next_above[positions[walk] + 2] - 1
+
+    return lefts, rights
+
+
+_REFERENCE_KERNELS = {
+    "climb_peaks": _climb_peaks,
+    "peak_ranges": _peak_ranges,
+    "threshold_ranges": _threshold_ranges,
+    "descend_slopes": _descend_slopes,
+}
+
+_PYTHON_KERNELS = {
+    **_REFERENCE_KERNELS,
+    "climb_peaks": _climb_peaks_numpy,
+    "peak_ranges": _peak_ranges_numpy,
+}
+
+_numba_kernels: dict | None = None
+
+
+def _compiled_kernels() -> dict:
+    global _numba_kernels
+
+    if _numba_kernels is None:
+        _numba_kernels = {
+            name: numba.njit(cache=True, nogil=True)(kernel)
+            for name, kernel in _REFERENCE_KERNELS.items()
+        }
+
+    return _numba_kernels
+
+
+def available_backends() -> list[str]:
+    """Backends that can be used in this environment
+
+    Returns:
+        list[str]: backend names
+    """
+    if numba is None:
+        return [REFERENCE, PYTHON]
+    return [REFERENCE, PYTHON, NUMBA]
+
+
+def _resolve(name: str) -> str:
+    name = name.lower()
+    if name == AUTO:
+        return NUMBA if numba is not None else PYTHON
+
+    if name not in (REFERENCE, PYTHON, NUMBA):
+        raise ValueError(f"Unknown backend: {name}")
+
+    if name == NUMBA and numba is None:
+        raise ImportError("The numba backend requires numba to be installed")
+
+    return name
+
+
+_backend = _resolve(environ.get("OPENEOG_BACKEND", AUTO))
+
+
+def get_backend() -> str:
+    """Active backend
+
+    Returns:
+        str: backend name
+    """
+    return _backend
+
+
+def set_backend(name: str) -> str:
+    """Select the implementation used by the kernels
+
+    Args:
+        name (str): "reference", "python", "numba" or "auto"
+
+    Returns:
+        str: previously active backend
+    """
+    global _backend
+
+    previous = _backend
+    _backend = _resolve(name)
+    return previous
+
+
+def _kernel(name: str):
+    if _backend == NUMBA:
+        return _compiled_kernels()[name]
+    if _backend == REFERENCE:
+        return _REFERENCE_KERNELS[name]
+    return _PYTHON_KERNELS[name]
+
+
+def _positions(positions) -> np.ndarray:
+    return np.ascontiguousarray(positions, dtype=np.int64).reshape(-1)
+
+
+def climb_peaks(vel_channel: np.ndarray, positions) -> np.ndarray:
+    """Move every position uphill until it sits on a local maximum
+
+    Args:
+        vel_channel (ndarray): Velocity channel
+        positions (array_like): Starting positions
+
+    Returns:
+        ndarray: Local maxima positions
+    """
+    return _kernel("climb_peaks")(
+        np.ascontiguousarray(vel_channel),
+        _positions(positions),
+    )
+
+
+def peak_ranges(
+    vel_channel: np.ndarray,
+    positions,
+    threshold: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Calibration impulse range around every peak
+
+    Args:
+        vel_channel (ndarray): Absolute velocity channel
+        positions (array_like): Peak positions
+        threshold (float): Velocity threshold
+
+    Returns:
+        tuple[ndarray, ndarray]: (lefts, rights)
+    """
+    return _kernel("peak_ranges")(
+        np.ascontiguousarray(vel_channel),
+        _positions(positions),
+        float(threshold),
+    )
+
+
+def threshold_ranges(
+    channel: np.ndarray,
+    positions,
+    threshold: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Extend every position while the channel stays at or above the threshold
+
+    Args:
+        channel (ndarray): Channel
+        positions (array_like): Seed positions
+        threshold (float): Threshold
+
+    Returns:
+        tuple[ndarray, ndarray]: (onsets, offsets)
+    """
+    return _kernel("threshold_ranges")(
+        np.ascontiguousarray(channel),
+        _positions(positions),
+        float(threshold),
+    )
+
+
+def descend_slopes(
+    channel: np.ndarray,
+    onsets,
+    offsets,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Extend every interval while the channel keeps descending away from it
+
+    Args:
+        channel (ndarray): Channel
+        onsets (array_like): Interval onsets
+        offsets (array_like): Interval offsets
+
+    Returns:
+        tuple[ndarray, ndarray]: (onsets, offsets)
+    """
+    return _kernel("descend_slopes")(
+        np.ascontiguousarray(channel),
+        _positions(onsets),
+        _positions(offsets),
+    )
+
+
+def runs(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Closed runs of True values in a boolean mask
+
+    A run still open at the end of the mask is discarded, as the sequential
+    detectors never closed it.
+
+    Args:
+        mask (ndarray): Boolean mask
+
+    Returns:
+        tuple[ndarray, ndarray]: (first index, first index after the run)
+    """
+    edges = np.diff(mask.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if len(ends) and ends[-1] == len(mask):
+        starts, ends = starts[:-1], ends[:-1]
+    return starts, ends
+
+
+def segment_max(
+    values: np.ndarray,
+    onsets: np.ndarray,
+    offsets: np.ndarray,
+) -> np.ndarray:
+    """Maximum of every closed segment of an array
+
+    Args:
+        values (ndarray): Array
+        onsets (ndarray): First index of every segment, sorted
+        offsets (ndarray): Last index of every segment (segments must not
+            overlap)
+
+    Returns:
+        ndarray: Maximum of every segment
+    """
+    if not len(onsets):
+        return np.zeros(0, dtype=values.dtype)
+
+    # Los segmentos no se solapan, así que se puede reducir sobre los extremos
+    indexes = np.empty(2 * len(onsets), dtype=np.int64)
+    indexes[0::2] = onsets
+    indexes[1::2] = np.asarray(offsets) + 1
+    if indexes[-1] == len(values):
+        indexes = indexes[:-1]
+    return np.maximum.reduceat(values, indexes)[0::2]
@@ -1,7 +1,23 @@
 from .antisaccades import AntisaccadicBiomarkers
+from .bootstrap import confidence_intervals, with_confidence_intervals
+from .main_sequence import MainSequence, cohort_events, fit_main_sequence
 from .pursuits import PursuitBiomarkers
+from .saccades import SaccadicBiomarkers
+from .sweeps import antisaccadic_sweep, antisaccadic_sweeps
+from .windows import antisaccadic_windows, pursuit_windows, saccadic_windows
 
 __all__ = [
     "AntisaccadicBiomarkers",
+    "MainSequence",
     "PursuitBiomarkers",
+    "SaccadicBiomarkers",
+    "antisaccadic_sweep",
+    "antisaccadic_sweeps",
+    "antisaccadic_windows",
+    "cohort_events",
+    "confidence_intervals",
+    "fit_main_sequence",
+    "pursuit_windows",
+    "saccadic_windows",
+    "with_confidence_intervals",
 ]
@@ -1,15 +1,47 @@
+from copy import copy
 from functools import cached_property
 from typing import Iterator
 
 import numpy as np
 from scipy import signal
 
-from openeog.core import differentiation, helpers
-from openeog.core.models import AntiSaccade, Direction, Saccade, Size, Test
+from openeog.core import backend, differentiation, helpers
+from openeog.core.denoising import denoise_35
+from openeog.core.models import (
+    AnnotationTable,
+    AntiSaccade,
+    Direction,
+    Saccade,
+    Size,
+    Test,
+)
 from openeog.core.stimuli import SaccadicStimuliTransitions
 
 
 class AntisaccadicBiomarkers:
+    BIOMARKERS = (
+        "latency_mean",
+        "latency_std",
+        "memory_mean",
+        "memory_std",
+        "velocity_peak_mean",
+        "velocity_peak_std",
+        "duration_mean",
+        "duration_std",
+        "correction_latency_mean",
+        "correction_latency_std",
+        "response_inhibition",
+    )
+
+    # Ensayos de los que salen los biomarcadores {nombre}_mean y {nombre}_std
+    SAMPLES = {
+        "latency": "_latencies",
+        "memory": "_accuracy_locations_memory",
+        "velocity_peak": "_peak_velocities",
+        "duration": "_durations",
+        "correction_latency": "_correction_latencies",
+    }
+
     def __init__(
         self,
         test: Test,
@@ -17,6 +49,7 @@ class AntisaccadicBiomarkers:
         velocity_threshold: float = 15.0,
         duration_threshold: int = 15,
         sampling_frequency: float = 1000.0,
+        biomarkers: list[str] | None = None,
         **kwargs,
     ):
         """Constructor
@@ -27,11 +60,19 @@ class AntisaccadicBiomarkers:
             velocity_threshold (float, optional): velocity threshold. Defaults to 15.0.
             duration_threshold (int, optional): duration threshold. Defaults to 15.
             sampling_frequency (float, optional): sampling frequency. Defaults to 1000.0.
+            biomarkers (list[str] | None, optional): biomarkers returned by
+                to_dict (only those are computed). Defaults to None (all).
 
         Returns:
             AntisaccadicBiomarkers: object
         """
+        unknown = set(biomarkers or ()) - set(self.BIOMARKERS)
+        if unknown:
+            raise ValueError(f"Unknown biomarkers: {', '.join(sorted(unknown))}")
+
         self.angle = test.angle
+        self.biomarkers = list(biomarkers or self.BIOMARKERS)
+        self.to_cut = to_cut
         self.step = 1 / sampling_frequency
         self.velocity_threshold = velocity_threshold
         self.duration_threshold = duration_threshold
@@ -50,7 +91,7 @@ class AntisaccadicBiomarkers:
         self.centered_stim_channel = helpers.center_signal(scaled_stim_channel)
 
         # Eliminación de ruido de la señal horizontal
-        self.denoised_hori_channel = helpers.denoise_35(centered_hori_channel)
+        self.denoised_hori_channel = denoise_35(centered_hori_channel)
 
         # Cálculo del perfil de velocidad
         vel_channel = differentiation.differentiate(self.denoised_hori_channel)
@@ -61,29 +102,75 @@ class AntisaccadicBiomarkers:
             self.centered_stim_channel
         )
 
+    @cached_property
+    def peaks(self) -> np.ndarray:
+        """Velocity peaks (independent of the thresholds)
+
+        Returns:
+            np.ndarray: peak positions
+        """
+        return np.asarray(signal.find_peaks_cwt(self.abs_vel_channel, 30))
+
+    @cached_property
+    def impulse_ranges(self) -> tuple[np.ndarray, np.ndarray]:
+        """Ranges above the velocity threshold around every peak
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (onsets, offsets)
+        """
+        return backend.threshold_ranges(
+            self.abs_vel_channel,
+            self.peaks,
+            self.velocity_threshold,
+        )
+
+    def with_thresholds(
+        self,
+        velocity_threshold: float,
+        duration_threshold: int,
+        impulse_ranges: tuple[np.ndarray, np.ndarray] | None = None,
+    ) -> "AntisaccadicBiomarkers":
+        """Biomarkers of the same test with other thresholds
+
+        The preprocessed channels and the peaks are shared, only the threshold
+        dependent values are computed again.
+
+        Args:
+            velocity_threshold (float): velocity threshold
+            duration_threshold (int): duration threshold
+            impulse_ranges (tuple[ndarray, ndarray] | None, optional): ranges
+                already computed for the velocity threshold. Defaults to None.
+
+        Returns:
+            AntisaccadicBiomarkers: object
+        """
+        self.peaks  # Se calcula una sola vez para todas las variantes
+
+        result = copy(self)
+        result.__dict__ = {
+            name: value
+            for name, value in self.__dict__.items()
+            if name == "peaks"
+            or not isinstance(getattr(type(self), name, None), cached_property)
+        }
+        result.velocity_threshold = velocity_threshold
+        result.duration_threshold = duration_threshold
+        if impulse_ranges is not None:
+            result.__dict__["impulse_ranges"] = impulse_ranges
+
+        return result
+
     def _iterate_impulses(self) -> Iterator[tuple[int, int]]:
         """Iterate over impulses
 
         Yields:
             Iterator[tuple[int, int]]: (onset, offset)
         """
-        channel = self.abs_vel_channel
-        peaks = signal.find_peaks_cwt(channel, 30)
-
-        for peak in peaks:
-            onset = peak
-            while onset > 0 and channel[onset - 1] >= self.velocity_threshold:
-                onset -= 1
-
-            offset = peak
-            while (
-                offset < len(channel) - 1
-                and channel[offset + 1] >= self.velocity_threshold
-            ):
-                offset += 1
+        onsets, offsets = self.impulse_ranges
 
+        for onset, offset in zip(onsets, offsets):
             if offset - onset >= self.duration_threshold:
-                yield onset, offset
+                yield int(onset), int(offset)
 
     def _clasify_impulses(
         self,
@@ -171,21 +258,21 @@ class AntisaccadicBiomarkers:
         Returns:
             list[Saccade | AntiSaccade]: annotations
         """
-        result = [annotation for annotation in self._detect_all_annotations()]
+        annotations = [annotation for annotation in self._detect_all_annotations()]
 
         result = []
-        for idx, annotation in enumerate(result):
+        for idx, annotation in enumerate(annotations):
             if annotation.size == Size.Large and isinstance(annotation, AntiSaccade):
                 # Es una antisácada válida por lo que la lanzamos
                 result.append(annotation)
                 continue
 
             if annotation.size == Size.Small and isinstance(annotation, Saccade):
-                if idx == len(result) - 1:
+                if idx == len(annotations) - 1:
                     # Es el último evento por lo tanto nos la saltamos
                     continue
 
-                next_event = result[idx + 1]
+                next_event = annotations[idx + 1]
                 if annotation.transition_index != next_event.transition_index:
                     # El evento y el siguiente no están en la misma transición de estímulo por lo que nos la saltamos
                     continue
@@ -226,6 +313,15 @@ class AntisaccadicBiomarkers:
             if isinstance(annotation, Saccade)
         ]
 
+    @cached_property
+    def antisaccades_table(self) -> AnnotationTable:
+        """Antisaccades as columns
+
+        Returns:
+            AnnotationTable: antisaccades
+        """
+        return AnnotationTable.from_annotations(self.antisaccades)
+
     # Biomarcadores temporales
 
     @cached_property
@@ -235,9 +331,7 @@ class AntisaccadicBiomarkers:
         Returns:
             np.ndarray: latencies
         """
-        return np.array(
-            [antisaccade.latency * self.step for antisaccade in self.antisaccades]
-        )
+        return self.antisaccades_table["latency"] * self.step
 
     @cached_property
     def latency_mean(self) -> float:
@@ -326,9 +420,7 @@ class AntisaccadicBiomarkers:
         Returns:
             np.ndarray: durations
         """
-        return np.array(
-            [antisaccade.duration * self.step for antisaccade in self.antisaccades]
-        )
+        return self.antisaccades_table["duration"] * self.step
 
     @cached_property
     def duration_mean(self) -> float:
@@ -406,9 +498,7 @@ class AntisaccadicBiomarkers:
         Returns:
             np.ndarray: peak velocities
         """
-        return np.array(
-            [antisaccade.peak_velocity for antisaccade in self.antisaccades]
-        )
+        return self.antisaccades_table["peak_velocity"]
 
     @cached_property
     def velocity_peak_mean(self) -> float:
@@ -456,19 +546,7 @@ class AntisaccadicBiomarkers:
         Returns:
             dict[str, int | float]: dictionary
         """
-        return {
-            "latency_mean": self.latency_mean,
-            "latency_std": self.latency_std,
-            "memory_mean": self.memory_mean,
-            "memory_std": self.memory_std,
-            "velocity_peak_mean": self.velocity_peak_mean,
-            "velocity_peak_std": self.velocity_peak_std,
-            "duration_mean": self.duration_mean,
-            "duration_std": self.duration_std,
-            "correction_latency_mean": self.correction_latency_mean,
-            "correction_latency_std": self.correction_latency_std,
-            "response_inhibition": self.response_inhibition,
-        }
+        return {name: getattr(self, name) for name in self.biomarkers}
 
     def save_to(self, filename: str):
         raise NotImplementedError()
@@ -0,0 +1,117 @@
+"""Bootstrap confidence intervals of the biomarkers
+
+Every biomarker class lists in ``SAMPLES`` the per-trial arrays behind its
+``{name}_mean`` and ``{name}_std`` biomarkers. The trials are resampled with
+one index matrix per number of trials, shared by every array of that length
+(so the columns of a trial are resampled together), and the statistics of all
+the resamples are reductions along one axis.
+"""
+
+import numpy as np
+
+STATISTICS = {
+    "mean": lambda samples: samples.mean(axis=-1),
+    "std": lambda samples: samples.std(axis=-1),
+}
+
+
+def bootstrap_indexes(trials: int, resamples: int, seed: int = 0) -> np.ndarray:
+    """Resampling (with replacement) indexes
+
+    The generator is seeded with the seed and the number of trials, so the
+    indexes do not depend on the order in which arrays are resampled.
+
+    Args:
+        trials (int): Number of trials
+        resamples (int): Number of resamples
+        seed (int, optional): Seed. Defaults to 0.
+
+    Returns:
+        ndarray: (resamples, trials) indexes
+    """
+    rng = np.random.default_rng([seed, trials])
+    return rng.integers(0, trials, size=(resamples, trials))
+
+
+def confidence_intervals(
+    biomarkers,
+    resamples: int = 2000,
+    confidence: float = 0.95,
+    seed: int = 0,
+) -> dict[str, float]:
+    """Percentile bootstrap intervals of the biomarkers of an object
+
+    Args:
+        biomarkers: Biomarkers object (with ``SAMPLES`` and ``to_dict``)
+        resamples (int, optional): Number of resamples. Defaults to 2000.
+        confidence (float, optional): Confidence level. Defaults to 0.95.
+        seed (int, optional): Seed. Defaults to 0.
+
+    Returns:
+        dict[str, float]: ``{biomarker}_ci_low`` and ``{biomarker}_ci_high``
+            of every biomarker with samples
+    """
+    names = set(biomarkers.to_dict)
+    tail = (1 - confidence) / 2
+
+    indexes = {}
+    result = {}
+    for prefix, attribute in biomarkers.SAMPLES.items():
+        requested = [
+            statistic for statistic in STATISTICS if f"{prefix}_{statistic}" in names
+        ]
+        if not requested:
+            continue
+
+        samples = np.asarray(getattr(biomarkers, attribute), dtype=np.float64)
+        if len(samples):
+            if len(samples) not in indexes:
+                indexes[len(samples)] = bootstrap_indexes(
+                    len(samples),
+                    resamples,
+                    seed,
+                )
+            resampled = samples[indexes[len(samples)]]
+
+            statistics = np.stack(
+                [STATISTICS[statistic](resampled) for statistic in requested]
+            )
+            lows, highs = np.quantile(statistics, [tail, 1 - tail], axis=1)
+        else:
+            # Sin ensayos el biomarcador vale 0, igual que su intervalo
+            lows = highs = np.zeros(len(requested))
+
+        for statistic, low, high in zip(requested, lows, highs):
+            result[f"{prefix}_{statistic}_ci_low"] = float(low)
+            result[f"{prefix}_{statistic}_ci_high"] = float(high)
+
+    return result
+
+
+def with_confidence_intervals(
+    biomarkers,
+    resamples: int = 2000,
+    confidence: float = 0.95,
+    seed: int = 0,
+) -> dict[str, int | float]:
+    """Biomarkers followed by their bootstrap intervals
+
+    Args:
+        biomarkers: Biomarkers object (with ``SAMPLES`` and ``to_dict``)
+        resamples (int, optional): Number of resamples. Defaults to 2000.
+        confidence (float, optional): Confidence level. Defaults to 0.95.
+        seed (int, optional): Seed. Defaults to 0.
+
+    Returns:
+        dict[str, int | float]: dictionary
+    """
+    intervals = confidence_intervals(biomarkers, resamples, confidence, seed)
+
+    result = {}
+    for name, value in biomarkers.to_dict.items():
+        result[name] = value
+        if f"{name}_ci_low" in intervals:
+            result[f"{name}_ci_low"] = intervals[f"{name}_ci_low"]
+            result[f"{name}_ci_high"] = intervals[f"{name}_ci_high"]
+
+    return result
@@ -0,0 +1,355 @@
+"""Main sequence of the saccades of a cohort
+
+The amplitude, peak velocity and duration of every saccade of every subject
+are gathered in one structured array and the main sequence models are fitted
+to all the subjects at once:
+
+- power: ``velocity = a * amplitude ** b``, a straight line in log-log space;
+- exponential: ``velocity = vmax * (1 - exp(-amplitude / c))``, linear in vmax
+  for a fixed c, so c is initialised from a grid and both are refined with
+  Levenberg-Marquardt (damped Gauss-Newton) steps;
+- duration: ``duration = intercept + slope * amplitude``.
+
+Every per-subject sum is a ``bincount`` over the subject of each event, so a
+fit costs a few passes over the events whatever the number of subjects. The
+robust refinement reweights the events with Huber weights (iteratively
+reweighted least squares) and events whose residual exceeds a multiple of the
+robust scale of their subject are flagged as outliers.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from openeog.core.io import load_study
+from openeog.core.models import TestType
+
+from .saccades import SaccadicBiomarkers
+
+EVENT_DTYPE = np.dtype(
+    [
+        ("subject", np.int64),
+        ("amplitude", np.float64),  # Grados
+        ("peak_velocity", np.float64),  # Grados por segundo
+        ("duration", np.float64),  # Milisegundos
+    ]
+)
+
+PARAMETERS_DTYPE = np.dtype(
+    [
+        ("count", np.int64),
+        ("power_a", np.float64),
+        ("power_b", np.float64),
+        ("exponential_vmax", np.float64),
+        ("exponential_c", np.float64),
+        ("duration_intercept", np.float64),
+        ("duration_slope", np.float64),
+        ("velocity_scale", np.float64),
+        ("duration_scale", np.float64),
+    ]
+)
+
+HUBER = 1.345  # Constante de Huber (95 % de eficiencia con errores normales)
+MAD_SCALE = 1.4826  # MAD a desviación típica con errores normales
+
+
+@dataclass
+class MainSequence:
+    subjects: list[str]
+    parameters: np.ndarray  # PARAMETERS_DTYPE, uno por sujeto
+    events: np.ndarray  # EVENT_DTYPE
+    velocity_residuals: np.ndarray
+    duration_residuals: np.ndarray
+    outliers: np.ndarray
+
+
+def study_events(filepath: str) -> np.ndarray:
+    """Saccades of the saccadic tests of a study
+
+    Args:
+        filepath (str): Study filepath
+
+    Returns:
+        ndarray: events (EVENT_DTYPE, subject 0)
+    """
+    tables = []
+    for test in load_study(filepath):
+        if test.test_type == TestType.HorizontalSaccadic:
+            biomarkers = SaccadicBiomarkers(test)
+            tables.append((biomarkers.table, biomarkers.step * 1000.0))
+
+    events = np.zeros(sum(len(table) for table, _ in tables), EVENT_DTYPE)
+    start = 0
+    for table, milliseconds in tables:
+        end = start + len(table)
+        events["amplitude"][start:end] = table["amplitude"]
+        events["peak_velocity"][start:end] = table["peak_velocity"]
+        events["duration"][start:end] = table["duration"] * milliseconds
+        start = end
+
+    return events
+
+
+def cohort_events(filepaths: list[str], workers: int | None = None) -> np.ndarray:
+    """Saccades of the saccadic tests of a cohort
+
+    Args:
+        filepaths (list[str]): Study filepaths (one per subject)
+        workers (int | None, optional): Number of processes. Defaults to None.
+
+    Returns:
+        ndarray: events (EVENT_DTYPE), the subject is the position of the file
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        studies = list(executor.map(study_events, filepaths))
+
+    for subject, events in enumerate(studies):
+        events["subject"] = subject
+
+    return np.concatenate(studies) if studies else np.zeros(0, EVENT_DTYPE)
+
+
+def _sums(groups: np.ndarray, count: int, *values: np.ndarray) -> list[np.ndarray]:
+    return [np.bincount(groups, weights=value, minlength=count) for value in values]
+
+
+def _group_median(groups: np.ndarray, count: int, values: np.ndarray) -> np.ndarray:
+    order = np.lexsort((values, groups))
+    ordered = values[order]
+    sizes = np.bincount(groups, minlength=count)
+    starts = np.cumsum(sizes) - sizes
+
+    result = np.full(count, np.nan)
+    present = sizes > 0
+    low = starts[present] + (sizes[present] - 1) // 2
+    high = starts[present] + sizes[present] // 2
+    result[present] = (ordered[low] + ordered[high]) / 2
+    return result
+
+
+def _robust_scale(groups: np.ndarray, count: int, residuals: np.ndarray):
+    # Mediana de las desviaciones absolutas respecto a la mediana de cada sujeto
+    medians = _group_median(groups, count, residuals)
+    deviations = abs(residuals - medians[groups])
+    return MAD_SCALE * _group_median(groups, count, deviations)
+
+
+def _huber_weights(groups: np.ndarray, residuals: np.ndarray, scales: np.ndarray):
+    standardized = abs(residuals) / np.maximum(scales[groups], 1e-12)
+    return np.minimum(1.0, HUBER / np.maximum(standardized, 1e-12))
+
+
+def _lines(
+    groups: np.ndarray,
+    count: int,
+    x: np.ndarray,
+    y: np.ndarray,
+    weights: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    # Mínimos cuadrados ponderados de una recta por sujeto
+    sw, sx, sy, sxx, sxy = _sums(
+        groups,
+        count,
+        weights,
+        weights * x,
+        weights * y,
+        weights * x * x,
+        weights * x * y,
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slopes = (sw * sxy - sx * sy) / (sw * sxx - sx * sx)
+        intercepts = (sy - slopes * sx) / sw
+    return intercepts, slopes
+
+
+def _exponential_grid(
+    groups: np.ndarray,
+    count: int,
+    amplitudes: np.ndarray,
+    velocities: np.ndarray,
+    weights: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    # Para c fijo vmax es lineal: se elige el mejor c de una rejilla por sujeto
+    best_error = np.full(count, np.inf)
+    vmax = np.full(count, np.nan)
+    c = np.full(count, np.nan)
+    (total,) = _sums(groups, count, weights * velocities**2)
+    for candidate in np.geomspace(0.5, 100.0, 40):
+        shape = 1 - np.exp(-amplitudes / candidate)
+        sgv, sgg = _sums(
+            groups, count, weights * shape * velocities, weights * shape**2
+        )
+        with np.errstate(invalid="ignore", divide="ignore"):
+            error = total - sgv**2 / sgg
+            better = error < best_error
+            vmax = np.where(better, sgv / sgg, vmax)
+        best_error = np.where(better, error, best_error)
+        c = np.where(better, candidate, c)
+
+    return vmax, c
+
+
+def _exponential(
+    groups: np.ndarray,
+    count: int,
+    amplitudes: np.ndarray,
+    velocities: np.ndarray,
+    weights: np.ndarray,
+    iterations: int,
+    start: tuple[np.ndarray, np.ndarray] | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    if start is not None:
+        vmax, c = start
+    else:
+        vmax, c = _exponential_grid(groups, count, amplitudes, velocities, weights)
+
+    # Refinamiento de Levenberg-Marquardt simultáneo para todos los sujetos
+    damping = np.full(count, 1e-3)
+    for _ in range(iterations):
+        decay = np.exp(-amplitudes / c[groups])
+        residuals = velocities - vmax[groups] * (1 - decay)
+        d_vmax = 1 - decay
+        d_c = -vmax[groups] * decay * amplitudes / c[groups] ** 2
+
+        aa, ab, bb, ar, br, error = _sums(
+            groups,
+            count,
+            weights * d_vmax**2,
+            weights * d_vmax * d_c,
+            weights * d_c**2,
+            weights * d_vmax * residuals,
+            weights * d_c * residuals,
+            weights * residuals**2,
+        )
+        aa, bb = aa * (1 + damping), bb * (1 + damping)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            determinant = aa * bb - ab * ab
+            step_vmax = (bb * ar - ab * br) / determinant
+            step_c = (aa * br - ab * ar) / determinant
+
+        new_vmax = vmax + np.nan_to_num(step_vmax)
+        new_c = np.maximum(c + np.nan_to_num(step_c), 1e-3)
+        new_residuals = velocities - new_vmax[groups] * (
+            1 - np.exp(-amplitudes / new_c[groups])
+        )
+        (new_error,) = _sums(groups, count, weights * new_residuals**2)
+
+        # Solo se aceptan los pasos que reducen el error de cada sujeto
+        accepted = new_error <= error
+        vmax = np.where(accepted, new_vmax, vmax)
+        c = np.where(accepted, new_c, c)
+        damping = np.where(accepted, damping / 10, damping * 10)
+
+    return vmax, c
+
+
+def fit_main_sequence(
+    events: np.ndarray,
+    subjects: list[str] | None = None,
+    robust: bool = False,
+    iterations: int = 20,
+    robust_iterations: int = 5,
+    threshold: float = 3.0,
+) -> MainSequence:
+    """Fit the main sequence of every subject
+
+    Velocity residuals (and outliers) are relative to the exponential model.
+
+    Args:
+        events (ndarray): events (EVENT_DTYPE)
+        subjects (list[str] | None, optional): Subject names (by subject
+            index). Defaults to None (the indexes).
+        robust (bool, optional): Refine the fits with Huber weights.
+            Defaults to False.
+        iterations (int, optional): Levenberg-Marquardt iterations of the
+            exponential model. Defaults to 20.
+        robust_iterations (int, optional): Reweighting iterations.
+            Defaults to 5.
+        threshold (float, optional): Outlier threshold (in robust standard
+            deviations). Defaults to 3.0.
+
+    Returns:
+        MainSequence: parameters and residuals
+    """
+    groups = events["subject"]
+    count = int(groups.max()) + 1 if len(groups) else 0
+    if subjects is None:
+        subjects = [str(subject) for subject in range(count)]
+    count = max(count, len(subjects))
+
+    amplitudes = events["amplitude"]
+    velocities = events["peak_velocity"]
+    durations = events["duration"]
+
+    # Los logaritmos del modelo potencial necesitan valores positivos
+    valid = (amplitudes > 0) & (velocities > 0)
+    log_amplitudes = np.log(np.where(valid, amplitudes, 1.0))
+    log_velocities = np.log(np.where(valid, velocities, 1.0))
+
+    power_weights = valid.astype(np.float64)
+    velocity_weights = np.ones(len(events))
+    duration_weights = np.ones(len(events))
+
+    start = None
+    for step in range(robust_iterations + 1 if robust else 1):
+        log_a, b = _lines(groups, count, log_amplitudes, log_velocities, power_weights)
+        vmax, c = start = _exponential(
+            groups,
+            count,
+            amplitudes,
+            velocities,
+            velocity_weights,
+            # Al reponderar se parte del ajuste anterior
+            iterations if start is None else max(iterations // 4, 1),
+            start,
+        )
+        intercepts, slopes = _lines(
+            groups, count, amplitudes, durations, duration_weights
+        )
+
+        power_residuals = log_velocities - (log_a[groups] + b[groups] * log_amplitudes)
+        velocity_residuals = velocities - vmax[groups] * (
+            1 - np.exp(-amplitudes / c[groups])
+        )
+        duration_residuals = durations - (
+            intercepts[groups] + slopes[groups] * amplitudes
+        )
+
+        velocity_scale = _robust_scale(groups, count, velocity_residuals)
+        duration_scale = _robust_scale(groups, count, duration_residuals)
+
+        if step < robust_iterations and robust:
+            power_scale = _robust_scale(groups, count, power_residuals)
+            power_weights = valid * _huber_weights(groups, power_residuals, power_scale)
+            velocity_weights = _huber_weights(
+                groups, velocity_residuals, velocity_scale
+            )
+            duration_weights = _huber_weights(
+                groups, duration_residuals, duration_scale
+            )
+
+    with np.errstate(invalid="ignore"):
+        outliers = (abs(velocity_residuals) > threshold * velocity_scale[groups]) | (
+            abs(duration_residuals) > threshold * duration_scale[groups]
+        )
+
+    parameters = np.zeros(count, PARAMETERS_DTYPE)
+    parameters["count"] = np.bincount(groups, minlength=count)
+    parameters["power_a"] = np.exp(log_a)
+    parameters["power_b"] = b
+    parameters["exponential_vmax"] = vmax
+    parameters["exponential_c"] = c
+    parameters["duration_intercept"] = intercepts
+    parameters["duration_slope"] = slopes
+    parameters["velocity_scale"] = velocity_scale
+    parameters["duration_scale"] = duration_scale
+
+    return MainSequence(
+        subjects=list(subjects),
+        parameters=parameters,
+        events=events,
+        velocity_residuals=velocity_residuals,
+        duration_residuals=duration_residuals,
+        outliers=outliers,
+    )
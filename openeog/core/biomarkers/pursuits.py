@@ -2,7 +2,7 @@ from functools import cached_property
 
 import numpy as np
 from scipy import signal
-from scipy.signal import coherence, medfilt
+from scipy.signal import csd, medfilt, welch
 
 from openeog.core import differentiate, helpers
 from openeog.core.denoising import denoise_35
@@ -11,63 +11,145 @@ from openeog.core.saccades import saccades
 
 
 class PursuitBiomarkers:
+    BIOMARKERS = (
+        "waveform_mse",
+        "latency_mean",
+        "latency_std",
+        "corrective_saccades_count",
+        "velocity_mean",
+        "velocity_gain",
+        "spectral_coherence",
+    )
+
+    # Ensayos de los que salen los biomarcadores {nombre}_mean y {nombre}_std
+    SAMPLES = {
+        "latency": "cycle_latencies",
+    }
+
     def __init__(
         self,
         test: Test,
         to_cut: int = 100,
         invert_signal: bool = False,
+        max_displacement: int = 2000,
+        latency_method: str = "peaks",
+        biomarkers: list[str] | None = None,
         **kwargs,
     ):
         """Constructor
 
+        Every intermediate signal is computed once, the first time a biomarker
+        needs it, and shared by the rest.
+
         Args:
             test (Test): test
             to_cut (int): number of samples to cut
             invert_signal (bool, optional): invert signal. Defaults to False.
+            max_displacement (int, optional): maximum displacement (in samples)
+                explored by the waveform MSE. Defaults to 2000.
+            latency_method (str, optional): latency estimator, "peaks" (CWT peaks
+                of the position) or "xcorr" (per cycle cross-correlation of the
+                velocities). Defaults to "peaks".
+            biomarkers (list[str] | None, optional): biomarkers returned by
+                to_dict (only those are computed). Defaults to None (all).
 
         Returns:
             PursuitBiomarkers: object
         """
-        self.angle = test.angle
-        self.horizontal_channel = None
-        self.horizontal_cutted = None
+        if latency_method not in ("peaks", "xcorr"):
+            raise ValueError(f"Unknown latency method: {latency_method}")
 
+        unknown = set(biomarkers or ()) - set(self.BIOMARKERS)
+        if unknown:
+            raise ValueError(f"Unknown biomarkers: {', '.join(sorted(unknown))}")
+
+        self.angle = test.angle
+        self.to_cut = to_cut
+        self.max_displacement = max_displacement
+        self.latency_method = latency_method
+        self.biomarkers = list(biomarkers or self.BIOMARKERS)
+
+        # Vistas de los canales de la prueba, solo se copia al invertir
+        self.horizontal_channel = test.hor_channel[to_cut:-to_cut]
+        self.horizontal_cutted = test.hor_channel_raw[to_cut:-to_cut]
         if invert_signal:
-            self.horizontal_channel = test.hor_channel.copy()[to_cut:-to_cut] * -1
-            self.horizontal_cutted = test.hor_channel_raw.copy()[to_cut:-to_cut] * -1
-        else:
-            self.horizontal_channel = test.hor_channel.copy()[to_cut:-to_cut]
-            self.horizontal_cutted = test.hor_channel_raw.copy()[to_cut:-to_cut]
+            self.horizontal_channel = -self.horizontal_channel
+            # El canal crudo es sin signo
+            self.horizontal_cutted = -self.horizontal_cutted.astype(np.int64)
         amplitude = self.horizontal_channel.max() - self.horizontal_channel.min()
 
-        self.stimuli_channel = test.hor_stimuli.copy()[to_cut:-to_cut]
-        self.stimuli_channel -= self.stimuli_channel.mean()
-        self.stimuli_channel *= amplitude * 2
-        self.stimuli_cutted = test.hor_stimuli_raw.copy()[to_cut:-to_cut]
+        stimuli = test.hor_stimuli[to_cut:-to_cut]
+        self.stimuli_channel = (stimuli - stimuli.mean()) * (amplitude * 2)
+        self.stimuli_cutted = test.hor_stimuli_raw[to_cut:-to_cut]
 
-    @property
+    # Señales intermedias
+
+    @cached_property
+    def filtered_channel(self) -> np.ndarray:
+        """Channel without saccades (median filter)
+
+        Returns:
+            np.ndarray: channel
+        """
+        return medfilt(self.horizontal_channel, 201)
+
+    @cached_property
+    def eye_velocity(self) -> np.ndarray:
+        """Velocity of the filtered channel
+
+        Returns:
+            np.ndarray: velocity (in degrees per second)
+        """
+        return differentiate(self.filtered_channel)
+
+    @cached_property
+    def stimuli_velocity(self) -> np.ndarray:
+        """Velocity of the stimulus
+
+        Returns:
+            np.ndarray: velocity (in degrees per second)
+        """
+        return differentiate(self.stimuli_channel)
+
+    @cached_property
+    def _spectra(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Welch spectra of the stimulus and the channel and their cross spectrum
+
+        Returns:
+            tuple[ndarray, ndarray, ndarray]: (stimulus, channel, cross)
+        """
+        _, stimuli_spectrum = welch(self.stimuli_channel, fs=1000.0)
+        _, channel_spectrum = welch(self.horizontal_channel, fs=1000.0)
+        _, cross_spectrum = csd(
+            self.stimuli_channel,
+            self.horizontal_channel,
+            fs=1000.0,
+        )
+        return stimuli_spectrum, channel_spectrum, cross_spectrum
+
+    @cached_property
     def waveform_mse(self) -> tuple[int, float]:
         """Waveform MSE
 
         Returns:
             tuple[int, float]: displacement, error
         """
-        count = 2000
-        errors = np.zeros(count)
-        for i in range(1, count + 1):
-            offset = helpers.move(self.horizontal_channel, i)
-            errors[i - 1] = helpers.mse(self.stimuli_channel, offset)
-            best_displacement = errors.argmin()
-            best_error = errors[best_displacement]
+        errors = helpers.moved_mse(
+            self.stimuli_channel,
+            self.horizontal_channel,
+            self.max_displacement,
+        )
+        best_displacement = errors.argmin()
+        best_error = errors[best_displacement]
 
         return best_displacement, best_error
 
-    @property
-    def latency_mean(self) -> float:
-        """Latency Mean
+    @cached_property
+    def _peak_displacements(self) -> np.ndarray:
+        """Displacements between the stimulus and the channel peaks
 
         Returns:
-            float: latency (in seconds)
+            np.ndarray: displacements (in samples)
         """
         centered_channel = helpers.center_signal(self.horizontal_cutted)
         centered_stimuli = helpers.center_signal(self.stimuli_cutted)
@@ -79,12 +161,79 @@ class PursuitBiomarkers:
         peaks_channel = signal.find_peaks_cwt(abs(denoised_channel), 1000)[:-1]
         peaks_stim_channel = signal.find_peaks_cwt(abs(scaled_stim_channel), 1000)[:-1]
 
-        displacements = peaks_stim_channel - peaks_channel
+        return peaks_stim_channel - peaks_channel
+
+    @cached_property
+    def _xcorr_displacements(self) -> np.ndarray:
+        """Displacements between the stimulus and the channel velocities per cycle
+
+        Returns:
+            np.ndarray: displacements (in samples)
+        """
+        eye_velocity = differentiate(denoise_35(self.horizontal_channel))
+        stimuli_velocity = self.stimuli_velocity
+
+        # Corregimos la polaridad del canal para que siga al estímulo
+        if np.dot(eye_velocity, stimuli_velocity) < 0:
+            eye_velocity = -eye_velocity
+
+        # Cada ciclo empieza en un cruce ascendente por cero del estímulo
+        stimuli = self.stimuli_channel
+        crossings = np.flatnonzero((stimuli[:-1] < 0) & (stimuli[1:] >= 0)) + 1
+        if len(crossings) > 1:
+            length = int(np.diff(crossings).min())
+            starts = crossings[crossings + length <= len(stimuli)]
+        else:
+            length = len(stimuli)
+            starts = np.array([0])
+
+        lags = helpers.windowed_lags(
+            stimuli_velocity,
+            eye_velocity,
+            starts,
+            length,
+            length // 2,
+        )
+
+        # Mismo convenio de signo que con los picos: estímulo - canal
+        return -lags
+
+    @cached_property
+    def cycle_latencies(self) -> np.ndarray:
+        """Latency of every stimulus cycle
 
-        latency_res = int(round(displacements.mean(), 0))
+        Returns:
+            np.ndarray: latencies (in seconds)
+        """
+        if self.latency_method == "xcorr":
+            return self._xcorr_displacements / 1000.0
+        return self._peak_displacements / 1000.0
+
+    @cached_property
+    def latency_mean(self) -> float:
+        """Latency Mean
+
+        Returns:
+            float: latency (in seconds)
+        """
+        if self.latency_method == "xcorr":
+            latencies = self.cycle_latencies
+            return float(latencies.mean()) if len(latencies) else 0.0
+
+        latency_res = int(round(self._peak_displacements.mean(), 0))
 
         return latency_res / 1000.0
 
+    @cached_property
+    def latency_std(self) -> float:
+        """Latency Std
+
+        Returns:
+            float: latency (in seconds)
+        """
+        latencies = self.cycle_latencies
+        return float(latencies.std()) if len(latencies) else 0.0
+
     @cached_property
     def saccades(self) -> list[Saccade]:
         """Saccades
@@ -100,7 +249,7 @@ class PursuitBiomarkers:
             for start, end in saccades(self.horizontal_channel, self.angle)
         ]
 
-    @property
+    @cached_property
     def corrective_saccades_count(self) -> int:
         """Corrective saccades count
 
@@ -109,40 +258,33 @@ class PursuitBiomarkers:
         """
         return len(self.saccades)
 
-    @property
+    @cached_property
     def velocity_mean(self) -> float:
         """Velocity Mean
 
         Returns:
             float: velocity (in degrees per second)
         """
-        ch_filtered = medfilt(self.horizontal_channel, 201)
-        ch_f_vel = differentiate(ch_filtered)
-        mean_pursuit = abs(ch_f_vel.mean())
-        return mean_pursuit
+        return abs(self.eye_velocity.mean())
 
-    @property
+    @cached_property
     def velocity_gain(self) -> float:
         """Velocity Gain
 
         Returns:
             float: velocity gain
         """
-        mean_ch = self.velocity_mean
-        stimuli_vel = differentiate(self.stimuli_channel)
-        mean_stimuli = abs(stimuli_vel.mean())
-        gain_vel = mean_ch / mean_stimuli
-
-        return gain_vel
+        return self.velocity_mean / abs(self.stimuli_velocity.mean())
 
-    @property
+    @cached_property
     def spectral_coherence(self) -> float:
         """Spectral Coherence
 
         Returns:
             float: spectral coherence
         """
-        freqs, c = coherence(self.stimuli_channel, self.horizontal_channel, fs=1000.0)
+        stimuli_spectrum, channel_spectrum, cross_spectrum = self._spectra
+        c = abs(cross_spectrum) ** 2 / stimuli_spectrum / channel_spectrum
         coherence_factor = (1 - c)[:10].mean()
 
         return coherence_factor
@@ -154,14 +296,7 @@ class PursuitBiomarkers:
         Returns:
             dict[str, int | float]: dictionary
         """
-        return {
-            "waveform_mse": self.waveform_mse,
-            "latency_mean": self.latency_mean,
-            "corrective_saccades_count": self.corrective_saccades_count,
-            "velocity_mean": self.velocity_mean,
-            "velocity_gain": self.velocity_gain,
-            "spectral_coherence": self.spectral_coherence,
-        }
+        return {name: getattr(self, name) for name in self.biomarkers}
 
     def save_to(self, filename: str):
         raise NotImplementedError()
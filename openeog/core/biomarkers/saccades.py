@@ -0,0 +1,316 @@
+from functools import cached_property
+
+import numpy as np
+
+from openeog.core import backend
+from openeog.core.differentiation import velocity
+from openeog.core.epochs import DIRECTIONS as TRANSITION_DIRECTIONS
+from openeog.core.models import AnnotationTable, Direction, Saccade, Size, Test
+from openeog.core.models.annotations.table import (
+    ANNOTATION_DTYPE,
+    ANNOTATION_TYPES,
+    DIRECTIONS,
+    SIZES,
+)
+from openeog.core.models.enums import AnnotationType
+from openeog.core.saccades import saccades
+from openeog.core.stimuli import transitions
+
+
+class SaccadicBiomarkers:
+    BIOMARKERS = (
+        "latency_mean",
+        "latency_std",
+        "duration_mean",
+        "duration_std",
+        "amplitude_mean",
+        "amplitude_std",
+        "deviation_mean",
+        "deviation_std",
+        "velocity_peak_mean",
+        "velocity_peak_std",
+        "saccades_count",
+    )
+
+    # Ensayos de los que salen los biomarcadores {nombre}_mean y {nombre}_std
+    SAMPLES = {
+        "latency": "_latencies",
+        "duration": "_durations",
+        "amplitude": "_amplitudes",
+        "deviation": "_deviations",
+        "velocity_peak": "_peak_velocities",
+    }
+
+    def __init__(
+        self,
+        test: Test,
+        tolerance: float = 0.2,
+        detect: bool = False,
+        sampling_frequency: float = 1000.0,
+        biomarkers: list[str] | None = None,
+        **kwargs,
+    ):
+        """Constructor
+
+        The saccades are the annotations of the test, or they are detected when
+        the test has none (or ``detect`` is set). Every metric is computed for
+        all the saccades at once from their onsets and offsets.
+
+        Args:
+            test (Test): test
+            tolerance (float, optional): amplitude tolerance of the detector.
+                Defaults to 0.2.
+            detect (bool, optional): detect the saccades even if the test has
+                annotations. Defaults to False.
+            sampling_frequency (float, optional): sampling frequency.
+                Defaults to 1000.0.
+            biomarkers (list[str] | None, optional): biomarkers returned by
+                to_dict (only those are computed). Defaults to None (all).
+
+        Returns:
+            SaccadicBiomarkers: object
+        """
+        unknown = set(biomarkers or ()) - set(self.BIOMARKERS)
+        if unknown:
+            raise ValueError(f"Unknown biomarkers: {', '.join(sorted(unknown))}")
+
+        self.angle = test.angle
+        self.biomarkers = list(biomarkers or self.BIOMARKERS)
+        self.step = 1 / sampling_frequency
+        self.sampling_frequency = sampling_frequency
+
+        # Canal en grados y estímulo sin escalar (solo interesan sus cambios)
+        self.channel = test.hor_channel
+        self.stimuli = test.hor_stimuli_raw
+
+        annotations = [] if detect else test.hor_saccades
+        if annotations:
+            self.onsets = np.fromiter((a.onset for a in annotations), np.int64)
+            self.offsets = np.fromiter((a.offset for a in annotations), np.int64)
+        else:
+            intervals = np.array(
+                list(saccades(self.channel, self.angle, tolerance)),
+                dtype=np.int64,
+            ).reshape(-1, 2)
+            self.onsets, self.offsets = intervals[:, 0], intervals[:, 1]
+
+    @cached_property
+    def abs_vel_channel(self) -> np.ndarray:
+        """Absolute velocity of the denoised channel
+
+        Returns:
+            np.ndarray: velocity (in degrees per second)
+        """
+        return abs(velocity(self.channel, self.sampling_frequency))
+
+    @cached_property
+    def transitions(self) -> tuple[np.ndarray, np.ndarray]:
+        """Changes of the stimulus
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (first sample after every change,
+                sign of every change)
+        """
+        return transitions(self.stimuli)
+
+    @cached_property
+    def table(self) -> AnnotationTable:
+        """Saccades with all their metrics
+
+        Returns:
+            AnnotationTable: saccades
+        """
+        data = np.zeros(len(self.onsets), ANNOTATION_DTYPE)
+        data["annotation_type"] = ANNOTATION_TYPES.index(AnnotationType.Saccade)
+        data["onset"] = self.onsets
+        data["offset"] = self.offsets
+        data["duration"] = self.offsets - self.onsets
+
+        # Cambio del estímulo que precede a cada sácada y el siguiente
+        changes, signs = self.transitions
+        changes = np.append(changes, -1)  # Centinela: no hay siguiente cambio
+        signs = np.append(signs, 0)
+        position = np.searchsorted(changes[:-1], self.onsets) - 1
+        valid = position >= 0
+        before = np.where(valid, changes[position], -1)
+
+        data["transition_index"] = position
+        data["transition_change_before_index"] = before
+        data["transition_change_index"] = np.where(valid, changes[position + 1], -1)
+        data["latency"] = np.where(valid, self.onsets - before, 0)
+        # Mismo convenio que el resto de transiciones; sin cambio previo la
+        # posición -1 cae en el signo centinela 0
+        codes = np.full(3, DIRECTIONS.index(Direction.Same))
+        for sign, direction in TRANSITION_DIRECTIONS.items():
+            codes[sign + 1] = DIRECTIONS.index(direction)
+        data["transition_direction"] = codes[signs[position] + 1]
+
+        displacements = self.channel[self.offsets] - self.channel[self.onsets]
+        amplitudes = abs(displacements)
+        data["amplitude"] = amplitudes
+        data["deviation"] = amplitudes / self.angle
+        data["direction"] = np.select(
+            [displacements > 0, displacements < 0],
+            [DIRECTIONS.index(Direction.Right), DIRECTIONS.index(Direction.Left)],
+            DIRECTIONS.index(Direction.Same),
+        )
+        data["size"] = np.select(
+            [amplitudes < 1.0, amplitudes < 5.0],
+            [SIZES.index(Size.Invalid), SIZES.index(Size.Small)],
+            SIZES.index(Size.Large),
+        )
+
+        data["peak_velocity"] = backend.segment_max(
+            self.abs_vel_channel,
+            self.onsets,
+            self.offsets,
+        )
+
+        return AnnotationTable(data)
+
+    @cached_property
+    def saccades(self) -> list[Saccade]:
+        """Saccades
+
+        Returns:
+            list[Saccade]: saccades
+        """
+        return self.table.to_annotations()
+
+    # Biomarcadores temporales
+
+    @cached_property
+    def _latencies(self) -> np.ndarray:
+        # Las sácadas sin cambio previo del estímulo no tienen latencia
+        table = self.table
+        return table["latency"][table["transition_index"] >= 0] * self.step
+
+    @cached_property
+    def latency_mean(self) -> float:
+        """Saccades latency mean
+
+        Returns:
+            float: latency (in seconds)
+        """
+        return float(self._latencies.mean()) if len(self._latencies) else 0.0
+
+    @cached_property
+    def latency_std(self) -> float:
+        """Saccades latency std
+
+        Returns:
+            float: latency (in seconds)
+        """
+        return float(self._latencies.std()) if len(self._latencies) else 0.0
+
+    @cached_property
+    def _durations(self) -> np.ndarray:
+        return self.table["duration"] * self.step
+
+    @cached_property
+    def duration_mean(self) -> float:
+        """Saccades duration mean
+
+        Returns:
+            float: duration (in seconds)
+        """
+        return float(self._durations.mean()) if len(self._durations) else 0.0
+
+    @cached_property
+    def duration_std(self) -> float:
+        """Saccades duration std
+
+        Returns:
+            float: duration (in seconds)
+        """
+        return float(self._durations.std()) if len(self._durations) else 0.0
+
+    # Biomarcadores espaciales
+
+    @cached_property
+    def _amplitudes(self) -> np.ndarray:
+        return self.table["amplitude"]
+
+    @cached_property
+    def _deviations(self) -> np.ndarray:
+        return self.table["deviation"]
+
+    @cached_property
+    def amplitude_mean(self) -> float:
+        """Saccades amplitude mean
+
+        Returns:
+            float: amplitude (in degrees)
+        """
+        return float(self._amplitudes.mean()) if len(self._amplitudes) else 0.0
+
+    @cached_property
+    def amplitude_std(self) -> float:
+        """Saccades amplitude std
+
+        Returns:
+            float: amplitude (in degrees)
+        """
+        return float(self._amplitudes.std()) if len(self._amplitudes) else 0.0
+
+    @cached_property
+    def deviation_mean(self) -> float:
+        """Saccades deviation mean
+
+        Returns:
+            float: amplitude over stimulus angle
+        """
+        return float(self._deviations.mean()) if len(self._deviations) else 0.0
+
+    @cached_property
+    def deviation_std(self) -> float:
+        """Saccades deviation std
+
+        Returns:
+            float: amplitude over stimulus angle
+        """
+        return float(self._deviations.std()) if len(self._deviations) else 0.0
+
+    # Biomarcadores cinéticos
+
+    @cached_property
+    def _peak_velocities(self) -> np.ndarray:
+        return self.table["peak_velocity"]
+
+    @cached_property
+    def velocity_peak_mean(self) -> float:
+        """Saccades peak velocity mean
+
+        Returns:
+            float: peak velocity
+        """
+        return (
+            float(self._peak_velocities.mean()) if len(self._peak_velocities) else 0.0
+        )
+
+    @cached_property
+    def velocity_peak_std(self) -> float:
+        """Saccades peak velocity std
+
+        Returns:
+            float: peak velocity
+        """
+        return float(self._peak_velocities.std()) if len(self._peak_velocities) else 0.0
+
+    @property
+    def saccades_count(self) -> int:
+        """Saccades count
+
+        Returns:
+            int: number of saccades
+        """
+        return len(self.table)
+
+    @property
+    def to_dict(self) -> dict[str, int | float]:
+        """To Dict
+
+        Returns:
+            dict[str, int | float]: dictionary
+        """
+        return {name: getattr(self, name) for name in self.biomarkers}
@@ -0,0 +1,135 @@
+"""Threshold sweeps of the antisaccadic biomarkers
+
+The preprocessing and the velocity peaks of a test only depend on ``to_cut``,
+so they are computed once per value. The ranges above every velocity
+threshold of the grid are found at once over a (thresholds, samples) array
+and the biomarkers of every grid point are computed from them.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import product
+
+import numpy as np
+
+from openeog.core.models import Test
+
+from .antisaccades import AntisaccadicBiomarkers
+
+GRID_FIELDS = ["to_cut", "velocity_threshold", "duration_threshold"]
+
+
+def threshold_grid_ranges(
+    channel: np.ndarray,
+    peaks: np.ndarray,
+    thresholds: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Ranges at or above every threshold around every peak
+
+    Same result as ``backend.threshold_ranges`` for each threshold.
+
+    Args:
+        channel (ndarray): Channel
+        peaks (ndarray): Seed positions
+        thresholds (ndarray): Thresholds
+
+    Returns:
+        tuple[ndarray, ndarray]: (onsets, offsets), (thresholds, peaks) arrays
+    """
+    samples = len(channel)
+    indexes = np.arange(samples)
+    below = channel[np.newaxis, :] < np.asarray(thresholds)[:, np.newaxis]
+
+    # Última muestra por debajo del umbral hasta cada posición y primera desde ella
+    last_below = np.maximum.accumulate(np.where(below, indexes, -1), axis=1)
+    next_below = np.minimum.accumulate(
+        np.where(below, indexes, samples)[:, ::-1], axis=1
+    )[:, ::-1]
+
+    peaks = np.asarray(peaks, dtype=np.int64)
+    onsets = np.where(peaks > 0, last_below[:, np.maximum(peaks - 1, 0)] + 1, 0)
+    onsets = np.minimum(onsets, peaks)
+
+    after = np.minimum(peaks + 1, samples - 1)
+    offsets = np.where(peaks < samples - 1, next_below[:, after] - 1, samples - 1)
+    offsets = np.maximum(offsets, peaks)
+
+    return onsets, offsets
+
+
+def antisaccadic_sweep(
+    test: Test,
+    velocity_thresholds: list[float],
+    duration_thresholds: list[int],
+    to_cuts: tuple[int, ...] = (100,),
+) -> np.ndarray:
+    """Antisaccadic biomarkers of a test for every combination of parameters
+
+    Args:
+        test (Test): Antisaccadic test
+        velocity_thresholds (list[float]): Velocity thresholds
+        duration_thresholds (list[int]): Duration thresholds
+        to_cuts (tuple[int, ...], optional): Samples cut at both ends.
+            Defaults to (100,).
+
+    Returns:
+        ndarray: Structured array with the parameters and the biomarkers of
+            every grid point
+    """
+    rows = []
+    for to_cut in to_cuts:
+        biomarkers = AntisaccadicBiomarkers(test, to_cut=to_cut)
+        onsets, offsets = threshold_grid_ranges(
+            biomarkers.abs_vel_channel,
+            biomarkers.peaks,
+            velocity_thresholds,
+        )
+
+        for (idx, velocity_threshold), duration_threshold in product(
+            enumerate(velocity_thresholds),
+            duration_thresholds,
+        ):
+            variant = biomarkers.with_thresholds(
+                velocity_threshold,
+                duration_threshold,
+                (onsets[idx], offsets[idx]),
+            )
+            rows.append(
+                (to_cut, velocity_threshold, duration_threshold)
+                + tuple(variant.to_dict.values())
+            )
+
+    names = GRID_FIELDS + list(variant.to_dict)
+    return np.array(rows, dtype=[(name, np.float64) for name in names])
+
+
+def antisaccadic_sweeps(
+    tests: list[Test],
+    velocity_thresholds: list[float],
+    duration_thresholds: list[int],
+    to_cuts: tuple[int, ...] = (100,),
+    workers: int | None = None,
+) -> list[np.ndarray]:
+    """Antisaccadic sweeps of several tests in parallel
+
+    Args:
+        tests (list[Test]): Antisaccadic tests
+        velocity_thresholds (list[float]): Velocity thresholds
+        duration_thresholds (list[int]): Duration thresholds
+        to_cuts (tuple[int, ...], optional): Samples cut at both ends.
+            Defaults to (100,).
+        workers (int | None, optional): Number of processes. Defaults to None.
+
+    Returns:
+        list[ndarray]: Sweep of every test
+    """
+    sweep = partial(
+        antisaccadic_sweep,
+        velocity_thresholds=velocity_thresholds,
+        duration_thresholds=duration_thresholds,
+        to_cuts=to_cuts,
+    )
+
+    # Procesos: la búsqueda de picos (CWT) no libera el GIL
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(sweep, tests))
@@ -0,0 +1,260 @@
+"""Time resolved biomarkers
+
+The biomarkers of a test are computed over consecutive windows of stimulus
+trials (saccadic and antisaccadic tests) or of time (pursuit tests). Every
+window statistic comes from prefix sums looked up at the window edges, and the
+running maximum of the channels is a single filter pass, so the cost does not
+depend on the number of windows nor on their width.
+"""
+
+import numpy as np
+from scipy.ndimage import maximum_filter1d
+
+from openeog.core.models import AnnotationTable, AntiSaccade
+
+from .antisaccades import AntisaccadicBiomarkers
+from .pursuits import PursuitBiomarkers
+from .saccades import SaccadicBiomarkers
+
+
+def _prefix(values: np.ndarray) -> np.ndarray:
+    return np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+
+
+def windowed_stats(
+    positions: np.ndarray,
+    values: np.ndarray,
+    starts: np.ndarray,
+    width: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Count, mean and std of the values whose position falls in every window
+
+    Args:
+        positions (ndarray): Position of every value (trial index or time),
+            sorted
+        values (ndarray): Values
+        starts (ndarray): First position of every window
+        width (float): Width of the windows (in position units)
+
+    Returns:
+        tuple[ndarray, ndarray, ndarray]: (count, mean, std), NaN statistics
+            for empty windows
+    """
+    low = np.searchsorted(positions, starts, side="left")
+    high = np.searchsorted(positions, np.asarray(starts) + width, side="left")
+    counts = high - low
+
+    # Centrar antes de acumular evita la cancelación en la varianza
+    offset = values.mean() if len(values) else 0.0
+    centered = np.asarray(values, dtype=np.float64) - offset
+    sums = _prefix(centered)
+    squares = _prefix(centered**2)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = (sums[high] - sums[low]) / counts
+        variances = (squares[high] - squares[low]) / counts - means**2
+
+    return counts, means + offset, np.sqrt(np.maximum(variances, 0.0))
+
+
+def windowed_channel(
+    channel: np.ndarray,
+    width: int,
+    step: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Mean and maximum of a channel over sliding windows
+
+    Args:
+        channel (ndarray): Channel
+        width (int): Window width (in samples)
+        step (int): Distance between window starts (in samples)
+
+    Returns:
+        tuple[ndarray, ndarray, ndarray]: (window starts, mean, max)
+    """
+    starts = np.arange(0, len(channel) - width + 1, step)
+    sums = _prefix(channel)
+    means = (sums[starts + width] - sums[starts]) / width
+
+    # Máximo de las últimas width muestras en cada posición
+    maximums = maximum_filter1d(channel, width, origin=(width - 1) // 2)
+    return starts, means, maximums[starts + width - 1]
+
+
+def _trial_windows(trials_count: int, trials: int) -> np.ndarray:
+    return np.arange(max(trials_count - trials + 1, 0))
+
+
+def antisaccadic_windows(
+    biomarkers: AntisaccadicBiomarkers,
+    trials: int = 10,
+) -> np.ndarray:
+    """Antisaccadic biomarkers over windows of consecutive trials
+
+    Args:
+        biomarkers (AntisaccadicBiomarkers): biomarkers of the test
+        trials (int, optional): Trials per window. Defaults to 10.
+
+    Returns:
+        ndarray: Structured array with the first trial of every window and
+            the latency, peak velocity and error rate (direction errors per
+            trial) of its antisaccades
+    """
+    table = AnnotationTable.from_annotations(biomarkers.annotations)
+    antisaccades = np.fromiter(
+        (isinstance(a, AntiSaccade) for a in biomarkers.annotations),
+        dtype=bool,
+        count=len(table),
+    )
+    errors = ~antisaccades  # Sácadas hacia el estímulo, corregidas después
+
+    starts = _trial_windows(len(biomarkers.stimuli_transitions), trials)
+    positions = table["transition_index"]
+    _, latency_mean, latency_std = windowed_stats(
+        positions[antisaccades],
+        table["latency"][antisaccades] * biomarkers.step,
+        starts,
+        trials,
+    )
+    _, velocity_mean, velocity_std = windowed_stats(
+        positions[antisaccades],
+        table["peak_velocity"][antisaccades],
+        starts,
+        trials,
+    )
+    errors_count, _, _ = windowed_stats(
+        positions[errors],
+        np.ones(errors.sum()),
+        starts,
+        trials,
+    )
+
+    result = np.zeros(
+        len(starts),
+        dtype=[
+            ("trial", np.int64),
+            ("latency_mean", np.float64),
+            ("latency_std", np.float64),
+            ("velocity_peak_mean", np.float64),
+            ("velocity_peak_std", np.float64),
+            ("error_rate", np.float64),
+        ],
+    )
+    result["trial"] = starts
+    result["latency_mean"] = latency_mean
+    result["latency_std"] = latency_std
+    result["velocity_peak_mean"] = velocity_mean
+    result["velocity_peak_std"] = velocity_std
+    result["error_rate"] = errors_count / trials
+    return result
+
+
+def saccadic_windows(
+    biomarkers: SaccadicBiomarkers,
+    trials: int = 10,
+) -> np.ndarray:
+    """Saccadic biomarkers over windows of consecutive trials
+
+    Args:
+        biomarkers (SaccadicBiomarkers): biomarkers of the test
+        trials (int, optional): Trials per window. Defaults to 10.
+
+    Returns:
+        ndarray: Structured array with the first trial of every window and
+            the latency, deviation and peak velocity of its saccades and the
+            response rate (saccades per trial)
+    """
+    table = biomarkers.table
+    valid = table["transition_index"] >= 0  # Sácadas previas al primer cambio
+    positions = table["transition_index"][valid]
+
+    starts = _trial_windows(len(biomarkers.transitions[0]), trials)
+
+    result = np.zeros(
+        len(starts),
+        dtype=[
+            ("trial", np.int64),
+            ("latency_mean", np.float64),
+            ("latency_std", np.float64),
+            ("deviation_mean", np.float64),
+            ("deviation_std", np.float64),
+            ("velocity_peak_mean", np.float64),
+            ("velocity_peak_std", np.float64),
+            ("response_rate", np.float64),
+        ],
+    )
+    result["trial"] = starts
+
+    counts, result["latency_mean"], result["latency_std"] = windowed_stats(
+        positions,
+        table["latency"][valid] * biomarkers.step,
+        starts,
+        trials,
+    )
+    _, result["deviation_mean"], result["deviation_std"] = windowed_stats(
+        positions,
+        table["deviation"][valid],
+        starts,
+        trials,
+    )
+    _, result["velocity_peak_mean"], result["velocity_peak_std"] = windowed_stats(
+        positions,
+        table["peak_velocity"][valid],
+        starts,
+        trials,
+    )
+    result["response_rate"] = counts / trials
+    return result
+
+
+def pursuit_windows(
+    biomarkers: PursuitBiomarkers,
+    width: int = 5000,
+    step: int = 1000,
+) -> np.ndarray:
+    """Pursuit biomarkers over sliding time windows
+
+    Args:
+        biomarkers (PursuitBiomarkers): biomarkers of the test
+        width (int, optional): Window width (in samples). Defaults to 5000.
+        step (int, optional): Distance between windows (in samples).
+            Defaults to 1000.
+
+    Returns:
+        ndarray: Structured array with the start of every window (in seconds)
+            and the mean absolute eye velocity, velocity gain, peak eye
+            velocity and corrective saccades per second in it
+    """
+    starts, eye_mean, eye_peak = windowed_channel(
+        abs(biomarkers.eye_velocity),
+        width,
+        step,
+    )
+    _, stimuli_mean, _ = windowed_channel(
+        abs(biomarkers.stimuli_velocity),
+        width,
+        step,
+    )
+    onsets = np.fromiter(
+        (saccade.onset for saccade in biomarkers.saccades),
+        dtype=np.int64,
+    )
+    saccades_count, _, _ = windowed_stats(onsets, np.ones(len(onsets)), starts, width)
+
+    result = np.zeros(
+        len(starts),
+        dtype=[
+            ("time", np.float64),
+            ("velocity_mean", np.float64),
+            ("velocity_gain", np.float64),
+            ("velocity_peak", np.float64),
+            ("saccade_rate", np.float64),
+        ],
+    )
+    result["time"] = starts / 1000.0
+    result["velocity_mean"] = eye_mean
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result["velocity_gain"] = eye_mean / stimuli_mean
+    result["velocity_peak"] = eye_peak
+    result["saccade_rate"] = saccades_count / (width / 1000.0)
+    return result
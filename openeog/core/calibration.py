@@ -1,8 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
+from openeog.core import backend
 from openeog.core.differentiation import differentiate
 from openeog.core.denoising import denoise_35
-from openeog.core.models import Study, Test
+from openeog.core.logging import log
+from openeog.core.models import Study, Test, TestType
 from scipy import signal
 
 
@@ -10,7 +14,7 @@ def find_peaks(
     channel: np.ndarray,
     width: int = 200,  # In miliseconds
 ) -> tuple[
-    list[int],  # Peaks found
+    np.ndarray,  # Peaks found
     np.ndarray,  # Absolute velocity channel
 ]:
     # Encontrar los picos para saber donde buscar
@@ -24,35 +28,27 @@ def climb_peak(
     vel_channel: np.ndarray,
     position: int,
 ) -> int:
-    max_position = len(vel_channel) - 1
-    while position > 0 and position < max_position:
-        current_value = vel_channel[position]
-        left_value = vel_channel[position - 1]
-        right_value = vel_channel[position + 1]
-        if left_value > right_value > current_value:
-            position -= 1
-        elif right_value > left_value > current_value:
-            position += 1
-        else:
-            return position
+    return int(backend.climb_peaks(vel_channel, [position])[0])
 
 
 def filter_by_median(
-    vel_channel: np.ndarray, peaks: list[int], span: float = 0.5
+    vel_channel: np.ndarray, peaks: np.ndarray, span: float = 0.5
 ) -> tuple[
-    list[int],
+    np.ndarray,
     float,  # Median
 ]:
     # Filtrar por mediana para eliminar outliers
-    peak_values = [vel_channel[peak] for peak in peaks]
+    peaks = np.asarray(peaks, dtype=np.int64)
+    peak_values = vel_channel[peaks]
     median_peak = np.median(peak_values)
 
     max_value = median_peak * (1.0 + span)
     min_value = median_peak * (1.0 - span)
 
-    return [
-        peak for peak in peaks if max_value >= vel_channel[peak] >= min_value
-    ], median_peak
+    return (
+        peaks[(max_value >= peak_values) & (peak_values >= min_value)],
+        median_peak,
+    )
 
 
 def peak_range(
@@ -60,88 +56,104 @@ def peak_range(
     position: int,
     threshold=300,
 ) -> tuple[int, int]:
-    left = position - 1
-    while left > 0 and vel_channel[left - 1] > threshold:
-        left -= 1
-
-    right = position + 1
-    max_position = len(vel_channel) - 1
-    while right < max_position and vel_channel[right + 1] < threshold:
-        right += 1
-
-    return left, right
+    lefts, rights = backend.peak_ranges(vel_channel, [position], threshold)
+    return int(lefts[0]), int(rights[0])
 
 
 def filter_features(
     hor_channel: np.ndarray,
-    impulses: list[tuple[int, int]],
+    onsets: np.ndarray,
+    offsets: np.ndarray,
 ) -> tuple[
-    list[tuple[int, int]],
-    list[float],  # Amplitudes
+    np.ndarray,  # Onsets
+    np.ndarray,  # Offsets
+    np.ndarray,  # Amplitudes
 ]:
-    result = []
-    amplitudes = []
-    for onset, offset in impulses:
-        amplitude = abs(hor_channel[onset] - hor_channel[offset])
-        duration = offset - onset
+    hor_channel = np.asarray(hor_channel, dtype=np.float64)
+    amplitudes = abs(hor_channel[onsets] - hor_channel[offsets])
+    durations = offsets - onsets
 
-        if amplitude < 100:
-            continue
+    valid = (
+        (amplitudes >= 100)
+        & (amplitudes <= 300)
+        & (durations >= 40)
+        & (durations <= 70)
+    )
 
-        if amplitude > 300:
-            continue
+    return onsets[valid], offsets[valid], amplitudes[valid]
 
-        if duration < 40:
-            continue
 
-        if duration > 70:
-            continue
+def calibration_amplitudes(channel: np.ndarray) -> np.ndarray:
+    """Amplitudes of the calibration impulses of a channel
 
-        result.append((onset, offset))
-        amplitudes.append(amplitude)
+    Args:
+        channel (ndarray): Raw horizontal channel of a calibration test
 
-    return result, amplitudes
+    Returns:
+        ndarray: Amplitudes (in muV)
+    """
+    peaks, vel_channel = find_peaks(channel)
+    max_peaks = backend.climb_peaks(vel_channel, peaks)
+    filtered_peaks, _ = filter_by_median(vel_channel, max_peaks)
+    onsets, offsets = backend.peak_ranges(vel_channel, filtered_peaks, 300)
+    _, _, amplitudes = filter_features(channel, onsets, offsets)
+    return amplitudes
 
 
 def calibrate(
     study: Study,
     angle: float = 30.0,
+    all_calibrations: bool = False,
+    workers: int | None = None,
 ) -> float:  # Calibration difference
-    hc1: Test = study[0]
-
-    hor_channel1 = hc1._hor_channel
-    peaks1, vel_channel1 = find_peaks(hor_channel1)
-    max_peaks1 = [climb_peak(vel_channel1, peak) for peak in peaks1]
-    filtered_peaks1, median_peak1 = filter_by_median(vel_channel1, max_peaks1)
-    impulses1 = [peak_range(vel_channel1, peak) for peak in filtered_peaks1]
-    filtered_impulses1, amplitudes1 = filter_features(hor_channel1, impulses1)
-    if amplitudes1:
-        amplitudes_mean1 = np.mean(amplitudes1)
-    else:
-        amplitudes_mean1 = 0.0
-
-    hc2: Test = study[-1]
-
-    hor_channel2 = hc2._hor_channel
-    peaks2, vel_channel2 = find_peaks(hor_channel2)
-    max_peaks2 = [climb_peak(vel_channel2, peak) for peak in peaks2]
-    filtered_peaks2, median_peak2 = filter_by_median(vel_channel2, max_peaks2)
-    impulses2 = [peak_range(vel_channel2, peak) for peak in filtered_peaks2]
-    filtered_impulses2, amplitudes2 = filter_features(hor_channel2, impulses2)
-
-    if amplitudes2:
-        amplitudes_mean2 = np.mean(amplitudes2)
+    """Calibrate the horizontal channel of the study
+
+    The calibration tests are processed concurrently. The difference is always
+    computed between the first and the last calibration test used. When there
+    are no calibration tests or no calibration impulse is found the
+    calibration of the study is left as is.
+
+    Args:
+        study (Study): Study
+        angle (float, optional): Calibration angle. Defaults to 30.0.
+        all_calibrations (bool, optional): Use every horizontal calibration test
+            instead of only the first and last tests. Defaults to False.
+        workers (int | None, optional): Number of threads. Defaults to one per
+            calibration test.
+
+    Returns:
+        float: Calibration difference (ratio)
+    """
+    if all_calibrations:
+        tests: list[Test] = [
+            test for test in study if test.test_type == TestType.HorizontalCalibration
+        ]
     else:
-        amplitudes_mean2 = 0.0
-
-    if amplitudes1 and amplitudes2:
-        difference = abs(1.0 - amplitudes_mean1 / amplitudes_mean2) * 100.0
+        tests = [study[0], study[-1]]
+
+    if not tests:
+        log.warning("No calibration tests found, keeping the calibration")
+        return 1.0
+
+    with ThreadPoolExecutor(max_workers=workers or len(tests)) as executor:
+        amplitudes = list(
+            executor.map(
+                calibration_amplitudes,
+                [test.hor_channel_raw for test in tests],
+            )
+        )
+
+    first, last = amplitudes[0], amplitudes[-1]
+    if len(first) and len(last):
+        difference = abs(1.0 - first.mean() / last.mean()) * 100.0
     else:
         difference = 100.0
 
-    aggregated_mean = np.mean(amplitudes1 + amplitudes2)
-
-    study._hor_calibration = angle / aggregated_mean
-    study._hor_calibration_diff = difference
+    aggregated = np.concatenate(amplitudes)
+    if len(aggregated):
+        study.hor_calibration = angle / aggregated.mean()
+    else:
+        log.warning("No calibration impulses found, keeping the calibration")
+    study.hor_calibration_diff = difference
 
     return difference / 100.0
@@ -1,4 +1,10 @@
+from functools import lru_cache
+
+import numpy as np
 from numpy import array, convolve, ndarray
+from scipy import signal
+
+LANCZOS_11 = array([300, -294, -532, -503, -296, 0, 296, 503, 532, 294, -300])
 
 
 def differentiate(channel: ndarray) -> ndarray:
@@ -10,8 +16,89 @@ def differentiate(channel: ndarray) -> ndarray:
     Returns:
         ndarray: Channel
     """
-    window = array([300, -294, -532, -503, -296, 0, 296, 503, 532, 294, -300])
-    result = convolve(channel, window, "same") / 5148.0
+    result = convolve(channel, LANCZOS_11, "same") / 5148.0
     result[:5] = 0
     result[-5:] = 0
     return result * 1000.0
+
+
+@lru_cache
+def velocity_kernel(
+    fs: float = 1000.0,
+    cutoff: float = 17.5,
+    order: int = 3,
+    tolerance: float = 1e-9,
+) -> ndarray:
+    """FIR equivalent to a zero-phase Butterworth filter followed by differentiate
+
+    The impulse response of the forward-backward filter is truncated where it
+    falls below the tolerance (relative to its maximum) and convolved with the
+    Lanczos differentiator. The defaults match ``differentiate(denoise_35(x))``.
+
+    Args:
+        fs (float, optional): Sampling frequency. Defaults to 1000.0.
+        cutoff (float, optional): Cutoff frequency (in Hz). Defaults to 17.5.
+        order (int, optional): Order of the Butterworth filter. Defaults to 3.
+        tolerance (float, optional): Truncation threshold. Defaults to 1e-9.
+
+    Returns:
+        ndarray: Kernel (odd length, centered)
+    """
+    b, a = signal.butter(order, cutoff / (fs / 2.0))
+
+    # Respuesta al impulso del filtrado ida y vuelta, simétrica respecto al centro
+    length = int(20 * fs / cutoff) | 1
+    impulse = np.zeros(length)
+    impulse[length // 2] = 1.0
+    response = signal.filtfilt(b, a, impulse, padlen=0)
+
+    significant = np.flatnonzero(abs(response) > tolerance * abs(response).max())
+    half = max(length // 2 - significant[0], significant[-1] - length // 2)
+    response = response[length // 2 - half : length // 2 + half + 1]
+
+    kernel = convolve(response, LANCZOS_11) / 5148.0 * fs
+    kernel.setflags(write=False)  # Compartido por la caché
+    return kernel
+
+
+def velocity(
+    channel: ndarray,
+    fs: float = 1000.0,
+    cutoff: float = 17.5,
+    order: int = 3,
+) -> ndarray:
+    """Smoothed velocity of the channel in a single convolution
+
+    Equivalent to ``differentiate(denoise_35(channel))`` (relative error below
+    1e-9) but the kernel is finite, so any segment of the channel can be
+    processed given half the kernel of context.
+
+    Args:
+        channel (ndarray): Channel
+        fs (float, optional): Sampling frequency. Defaults to 1000.0.
+        cutoff (float, optional): Cutoff frequency (in Hz). Defaults to 17.5.
+        order (int, optional): Order of the Butterworth filter. Defaults to 3.
+
+    Returns:
+        ndarray: Velocity
+    """
+    channel = np.asarray(channel, dtype=np.float64)
+    kernel = velocity_kernel(fs, cutoff, order)
+    half = len(kernel) // 2
+
+    b, a = signal.butter(order, cutoff / (fs / 2.0))
+
+    def two_stages(segment: ndarray) -> ndarray:
+        return differentiate(signal.filtfilt(b, a, segment)) * (fs / 1000.0)
+
+    if len(channel) < 4 * half:
+        return two_stages(channel)
+
+    result = signal.oaconvolve(channel, kernel, "same")
+
+    # En los extremos filtfilt arranca en estado estacionario, algo que una
+    # convolución no reproduce: se calculan con el filtro en dos etapas
+    result[:half] = two_stages(channel[: 3 * half])[:half]
+    result[-half:] = two_stages(channel[-3 * half :])[-half:]
+
+    return result
@@ -0,0 +1,104 @@
+"""Trial epoching around stimulus transitions
+
+Every trial is a window of a channel around a change of the stimulus. Windows
+are taken from a sliding window view of the channel (built with stride tricks)
+so trial-wise measures become reductions along the second axis of the
+(trials, samples) array instead of per-trial Python code.
+"""
+
+from functools import cached_property
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .models import Direction
+
+DIRECTIONS = {1: Direction.Left, -1: Direction.Right}
+
+
+class Epochs:
+    def __init__(
+        self,
+        channel: np.ndarray,
+        transitions: np.ndarray,
+        signs: np.ndarray,
+        pre: int = 200,
+        post: int = 800,
+    ):
+        """Windows of a channel around the stimulus transitions
+
+        Transitions whose window does not fit in the channel are dropped, so
+        a channel shorter than a window gives no trials.
+
+        Args:
+            channel (ndarray): Channel
+            transitions (ndarray): First sample after every stimulus change
+            signs (ndarray): Sign of every stimulus change
+            pre (int, optional): Samples before the transition. Defaults to 200.
+            post (int, optional): Samples from the transition. Defaults to 800.
+        """
+        valid = (transitions >= pre) & (transitions + post <= len(channel))
+
+        self.transitions = transitions[valid]
+        self.signs = signs[valid]
+        self.pre = pre
+        self.post = post
+
+        if len(channel) >= pre + post:
+            self._windows = sliding_window_view(channel, pre + post)
+        else:
+            # Ninguna ventana cabe en el canal
+            self._windows = np.empty((0, pre + post), dtype=channel.dtype)
+
+    def __len__(self) -> int:
+        return len(self.transitions)
+
+    def __getitem__(self, trial: int) -> np.ndarray:
+        # Una fila de la vista: no se copian datos
+        return self._windows[self.transitions[trial] - self.pre]
+
+    @property
+    def times(self) -> np.ndarray:
+        """Sample of every column relative to the transition"""
+        return np.arange(-self.pre, self.post)
+
+    @property
+    def directions(self) -> list[Direction]:
+        return [DIRECTIONS[sign] for sign in self.signs]
+
+    @cached_property
+    def data(self) -> np.ndarray:
+        """(trials, pre + post) array with the window of every trial"""
+        return self._windows[self.transitions - self.pre]
+
+    @cached_property
+    def signed_data(self) -> np.ndarray:
+        """Windows flipped so every trial moves in the same direction"""
+        return self.data * self.signs[:, np.newaxis]
+
+    def of_direction(self, direction: Direction) -> np.ndarray:
+        """Windows of the trials of a direction
+
+        Args:
+            direction (Direction): Direction of the stimulus change
+
+        Returns:
+            ndarray: (trials, pre + post) array
+        """
+        return self.data[[d == direction for d in self.directions]]
+
+    def average(self, direction: Direction | None = None) -> np.ndarray:
+        """Averaged response
+
+        Args:
+            direction (Direction | None, optional): Only average the trials of
+                this direction. When None all the trials are averaged once
+                flipped to the same direction. Defaults to None.
+
+        Returns:
+            ndarray: Mean window
+        """
+        if direction is None:
+            return self.signed_data.mean(axis=0)
+
+        return self.of_direction(direction).mean(axis=0)
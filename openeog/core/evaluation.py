@@ -0,0 +1,423 @@
+"""Evaluation of the detectors against hand labelled recordings
+
+Labels are the spreadsheets produced by ``saccadic_report`` and corrected by
+hand: one sheet per saccadic test with the onset and offset of every saccade.
+They are loaded once into interval arrays, detected and labelled events are
+matched one to one with a tolerance on both ends and every configuration of a
+parameter grid is scored. The tests are processed in parallel and the stages
+that do not depend on the swept parameters are computed once per test.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from itertools import product
+from time import perf_counter
+
+import numpy as np
+from openpyxl import load_workbook
+from scipy.optimize import linear_sum_assignment
+
+from .biomarkers import AntisaccadicBiomarkers
+from .biomarkers.sweeps import threshold_grid_ranges
+from .impulses import impulses
+from .io import load_study
+from .models import Test, TestType
+from .saccades import saccades
+
+Intervals = tuple[np.ndarray, np.ndarray]
+
+
+@dataclass
+class LabelledTest:
+    test: Test
+    onsets: np.ndarray
+    offsets: np.ndarray
+
+
+@dataclass
+class Score:
+    true_positives: int
+    false_positives: int
+    false_negatives: int
+    onset_errors: np.ndarray  # Detectado - etiquetado, de cada acierto
+    offset_errors: np.ndarray
+
+    @property
+    def precision(self) -> float:
+        detected = self.true_positives + self.false_positives
+        return self.true_positives / detected if detected else 0.0
+
+    @property
+    def recall(self) -> float:
+        labelled = self.true_positives + self.false_negatives
+        return self.true_positives / labelled if labelled else 0.0
+
+    @property
+    def f1(self) -> float:
+        total = self.precision + self.recall
+        return 2 * self.precision * self.recall / total if total else 0.0
+
+    @property
+    def onset_error(self) -> float:
+        """Mean absolute onset error (in samples)"""
+        return float(abs(self.onset_errors).mean()) if self.true_positives else 0.0
+
+    @property
+    def offset_error(self) -> float:
+        """Mean absolute offset error (in samples)"""
+        return float(abs(self.offset_errors).mean()) if self.true_positives else 0.0
+
+    def __add__(self, other: "Score") -> "Score":
+        return Score(
+            self.true_positives + other.true_positives,
+            self.false_positives + other.false_positives,
+            self.false_negatives + other.false_negatives,
+            np.concatenate((self.onset_errors, other.onset_errors)),
+            np.concatenate((self.offset_errors, other.offset_errors)),
+        )
+
+    @property
+    def to_dict(self) -> dict[str, int | float]:
+        return {
+            "true_positives": self.true_positives,
+            "false_positives": self.false_positives,
+            "false_negatives": self.false_negatives,
+            "precision": self.precision,
+            "recall": self.recall,
+            "f1": self.f1,
+            "onset_error": self.onset_error,
+            "offset_error": self.offset_error,
+        }
+
+
+def load_labels(filepath: str) -> dict[int, Intervals]:
+    """Load the labelled saccades of a spreadsheet
+
+    Args:
+        filepath (str): Spreadsheet filepath (.xlsx)
+
+    Returns:
+        dict[int, Intervals]: (onsets, offsets) of every test by angle
+    """
+    workbook = load_workbook(filepath, read_only=True)
+
+    result = {}
+    for sheet in workbook.worksheets:
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header or "Inicio" not in header:
+            continue
+
+        onset, offset = header.index("Inicio"), header.index("Fin")
+        intervals = np.array(
+            [(row[onset], row[offset]) for row in rows if row[onset] is not None],
+            dtype=np.int64,
+        ).reshape(-1, 2)
+
+        angle = int(sheet.title.split()[-1])
+        result[angle] = intervals[:, 0], intervals[:, 1]
+
+    workbook.close()
+    return result
+
+
+def load_labelled_study(study_path: str, labels_path: str) -> list[LabelledTest]:
+    """Pair the saccadic tests of a study with their labels
+
+    Args:
+        study_path (str): Study filepath
+        labels_path (str): Spreadsheet filepath
+
+    Returns:
+        list[LabelledTest]: labelled tests
+    """
+    labels = load_labels(labels_path)
+    return [
+        LabelledTest(test, *labels[test.angle])
+        for test in load_study(study_path)
+        if test.test_type == TestType.HorizontalSaccadic and test.angle in labels
+    ]
+
+
+def match_events(
+    detected: Intervals,
+    labelled: Intervals,
+    tolerance: int = 30,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Match detected and labelled events one to one
+
+    A pair is a candidate when both onsets and offsets are within the
+    tolerance. The matching is an optimal assignment: it has the largest
+    number of pairs and, among those, the smallest sum of onset and offset
+    distances, so a labelled event that loses a contested detection can still
+    be paired with another one.
+
+    Args:
+        detected (Intervals): (onsets, offsets) sorted by onset
+        labelled (Intervals): (onsets, offsets) sorted by onset
+        tolerance (int, optional): Maximum difference (in samples).
+            Defaults to 30.
+
+    Returns:
+        tuple[ndarray, ndarray]: indexes of the matched detected and labelled
+            events (sorted by labelled event)
+    """
+    detected_onsets, detected_offsets = detected
+    labelled_onsets, labelled_offsets = labelled
+    empty = np.zeros(0, dtype=np.int64)
+    if not len(detected_onsets) or not len(labelled_onsets):
+        return empty, empty
+
+    # Distancias de cada etiqueta (filas) a cada detección (columnas)
+    onset_distances = abs(labelled_onsets[:, None] - detected_onsets[None, :])
+    offset_distances = abs(labelled_offsets[:, None] - detected_offsets[None, :])
+    valid = (onset_distances <= tolerance) & (offset_distances <= tolerance)
+    if not valid.any():
+        return empty, empty
+
+    # Un par inválido cuesta más que todos los válidos juntos, así la
+    # asignación óptima maximiza primero el número de aciertos
+    costs = (onset_distances + offset_distances).astype(np.float64)
+    penalty = 2.0 * tolerance * min(costs.shape) + 1.0
+    costs[~valid] = penalty
+
+    labelled_idx, detected_idx = linear_sum_assignment(costs)
+    matched = valid[labelled_idx, detected_idx]
+
+    return (
+        detected_idx[matched].astype(np.int64),
+        labelled_idx[matched].astype(np.int64),
+    )
+
+
+def score(detected: Intervals, labelled: Intervals, tolerance: int = 30) -> Score:
+    """Score detected events against labelled ones
+
+    Args:
+        detected (Intervals): (onsets, offsets) sorted by onset
+        labelled (Intervals): (onsets, offsets) sorted by onset
+        tolerance (int, optional): Maximum difference (in samples).
+            Defaults to 30.
+
+    Returns:
+        Score: score
+    """
+    detected_idx, labelled_idx = match_events(detected, labelled, tolerance)
+    matches = len(detected_idx)
+
+    return Score(
+        true_positives=matches,
+        false_positives=len(detected[0]) - matches,
+        false_negatives=len(labelled[0]) - matches,
+        onset_errors=detected[0][detected_idx] - labelled[0][labelled_idx],
+        offset_errors=detected[1][detected_idx] - labelled[1][labelled_idx],
+    )
+
+
+def _intervals(events) -> Intervals:
+    events = np.array(list(events), dtype=np.int64).reshape(-1, 2)
+    order = np.argsort(events[:, 0], kind="stable")
+    return events[order, 0], events[order, 1]
+
+
+def detect_saccades(test: Test, tolerance: float = 0.2) -> Intervals:
+    return _intervals(saccades(test.hor_channel, test.angle, tolerance))
+
+
+def detect_impulses(test: Test) -> Intervals:
+    return _intervals(impulses(test.hor_channel))
+
+
+def detect_antisaccadic_impulses(
+    test: Test,
+    to_cut: int = 100,
+    velocity_threshold: float = 15.0,
+    duration_threshold: int = 15,
+) -> Intervals:
+    biomarkers = AntisaccadicBiomarkers(
+        test,
+        to_cut=to_cut,
+        velocity_threshold=velocity_threshold,
+        duration_threshold=duration_threshold,
+    )
+    onsets, offsets = _intervals(biomarkers._iterate_impulses())
+    return onsets + to_cut, offsets + to_cut
+
+
+def _sweep(
+    detect,
+    test: Test,
+    configurations: list[dict],
+) -> list[tuple[Intervals, float]]:
+    result = []
+    for parameters in configurations:
+        start = perf_counter()
+        detected = detect(test, **parameters)
+        result.append((detected, perf_counter() - start))
+    return result
+
+
+def sweep_antisaccadic_impulses(
+    test: Test,
+    configurations: list[dict],
+) -> list[tuple[Intervals, float]]:
+    """Antisaccadic impulses of a test for every configuration
+
+    The preprocessing and the velocity peaks only depend on ``to_cut``, so
+    they are computed once per value, and the ranges of every velocity
+    threshold are found at once. The run time of a configuration includes
+    its share of those stages.
+
+    Args:
+        test (Test): Test
+        configurations (list[dict]): Parameters of every configuration
+
+    Returns:
+        list[tuple[Intervals, float]]: (impulses, run time) of every
+            configuration
+    """
+    defaults = {"to_cut": 100, "velocity_threshold": 15.0, "duration_threshold": 15}
+    configurations = [{**defaults, **parameters} for parameters in configurations]
+
+    groups: dict[int, list[int]] = {}
+    for position, parameters in enumerate(configurations):
+        groups.setdefault(parameters["to_cut"], []).append(position)
+
+    result: list[tuple[Intervals, float] | None] = [None] * len(configurations)
+    for to_cut, positions in groups.items():
+        start = perf_counter()
+        biomarkers = AntisaccadicBiomarkers(test, to_cut=to_cut)
+        thresholds = sorted(
+            {configurations[position]["velocity_threshold"] for position in positions}
+        )
+        onsets, offsets = threshold_grid_ranges(
+            biomarkers.abs_vel_channel,
+            biomarkers.peaks,
+            thresholds,
+        )
+        shared = (perf_counter() - start) / len(positions)
+
+        for position in positions:
+            parameters = configurations[position]
+            start = perf_counter()
+            row = thresholds.index(parameters["velocity_threshold"])
+            variant = biomarkers.with_thresholds(
+                parameters["velocity_threshold"],
+                parameters["duration_threshold"],
+                (onsets[row], offsets[row]),
+            )
+            detected_onsets, detected_offsets = _intervals(variant._iterate_impulses())
+            result[position] = (
+                (detected_onsets + to_cut, detected_offsets + to_cut),
+                shared + perf_counter() - start,
+            )
+
+    return result
+
+
+DETECTORS = {
+    "saccades": detect_saccades,
+    "impulses": detect_impulses,
+    "antisaccadic_impulses": detect_antisaccadic_impulses,
+}
+
+# Detectores con etapas compartidas entre configuraciones
+SWEEPS = {
+    "antisaccadic_impulses": sweep_antisaccadic_impulses,
+}
+
+
+def evaluate(
+    detector: str,
+    parameters: dict,
+    cases: list[LabelledTest],
+    tolerance: int = 30,
+) -> tuple[Score, float]:
+    """Score a detector configuration over labelled tests
+
+    Args:
+        detector (str): Detector name (key of DETECTORS)
+        parameters (dict): Detector parameters
+        cases (list[LabelledTest]): Labelled tests
+        tolerance (int, optional): Maximum difference (in samples).
+            Defaults to 30.
+
+    Returns:
+        tuple[Score, float]: (aggregated score, run time in seconds)
+    """
+    detect = DETECTORS[detector]
+
+    result = Score(0, 0, 0, np.zeros(0), np.zeros(0))
+    elapsed = 0.0
+    for case in cases:
+        start = perf_counter()
+        detected = detect(case.test, **parameters)
+        elapsed += perf_counter() - start
+
+        result += score(detected, (case.onsets, case.offsets), tolerance)
+
+    return result, elapsed
+
+
+def _evaluate_case(
+    case: LabelledTest,
+    detector: str,
+    configurations: list[dict],
+    tolerance: int,
+) -> list[tuple[Score, float]]:
+    sweep = SWEEPS.get(detector) or partial(_sweep, DETECTORS[detector])
+    return [
+        (score(detected, (case.onsets, case.offsets), tolerance), elapsed)
+        for detected, elapsed in sweep(case.test, configurations)
+    ]
+
+
+def grid_search(
+    detector: str,
+    grid: dict[str, list],
+    cases: list[LabelledTest],
+    tolerance: int = 30,
+    workers: int | None = None,
+) -> list[tuple[dict, Score, float]]:
+    """Score every configuration of a parameter grid
+
+    Every labelled test is processed in parallel with all the configurations,
+    so the stages shared by the configurations are computed once per test.
+
+    Args:
+        detector (str): Detector name (key of DETECTORS)
+        grid (dict[str, list]): Values of every parameter
+        cases (list[LabelledTest]): Labelled tests
+        tolerance (int, optional): Maximum difference (in samples).
+            Defaults to 30.
+        workers (int | None, optional): Number of processes. Defaults to None.
+
+    Returns:
+        list[tuple[dict, Score, float]]: (parameters, score, run time) of
+            every configuration, best F1 first
+    """
+    configurations = [dict(zip(grid, values)) for values in product(*grid.values())]
+    run = partial(
+        _evaluate_case,
+        detector=detector,
+        configurations=configurations,
+        tolerance=tolerance,
+    )
+
+    # Procesos: la búsqueda de picos (CWT) no libera el GIL
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(run, cases))
+
+    ranking = []
+    for position, parameters in enumerate(configurations):
+        result = Score(0, 0, 0, np.zeros(0), np.zeros(0))
+        elapsed = 0.0
+        for case_results in results:
+            case_score, case_elapsed = case_results[position]
+            result += case_score
+            elapsed += case_elapsed
+        ranking.append((parameters, result, elapsed))
+
+    ranking.sort(key=lambda item: item[1].f1, reverse=True)
+    return ranking
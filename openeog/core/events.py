@@ -0,0 +1,165 @@
+from typing import Iterator
+
+import numpy as np
+from scipy.ndimage import maximum_filter1d, uniform_filter1d
+
+from .denoising import denoise_35
+from .differentiation import differentiate
+from .models import AnnotationType
+
+LABELS = [
+    AnnotationType.Fixation,
+    AnnotationType.Pursuit,
+    AnnotationType.Saccade,
+    AnnotationType.Blink,
+]
+
+FIXATION, PURSUIT, SACCADE, BLINK = range(len(LABELS))
+
+
+class EventTable:
+    def __init__(self, onsets: np.ndarray, offsets: np.ndarray, labels: np.ndarray):
+        """Interval table of classified events
+
+        Args:
+            onsets (ndarray): first sample of every event
+            offsets (ndarray): last sample of every event
+            labels (ndarray): index in LABELS of every event
+        """
+        self.onsets = onsets
+        self.offsets = offsets
+        self.labels = labels
+
+    def __len__(self) -> int:
+        return len(self.onsets)
+
+    def __iter__(self) -> Iterator[tuple[int, int, AnnotationType]]:
+        for onset, offset, label in zip(self.onsets, self.offsets, self.labels):
+            yield int(onset), int(offset), LABELS[label]
+
+    @property
+    def durations(self) -> np.ndarray:
+        return self.offsets - self.onsets + 1
+
+    def of_type(self, annotation_type: AnnotationType) -> tuple[np.ndarray, np.ndarray]:
+        """Events of a given type
+
+        Args:
+            annotation_type (AnnotationType): event type
+
+        Returns:
+            tuple[ndarray, ndarray]: (onsets, offsets)
+        """
+        mask = self.labels == LABELS.index(annotation_type)
+        return self.onsets[mask], self.offsets[mask]
+
+
+def _normalized_velocities(channel: np.ndarray) -> np.ndarray:
+    # Velocidad en unidades de su desviación típica robusta (basada en la mediana)
+    velocities = differentiate(denoise_35(channel))
+    sigma = np.median(abs(velocities)) / 0.6745
+
+    # Un canal plano (por ejemplo el vertical borrado) no produce eventos
+    if sigma == 0:
+        return np.zeros_like(velocities)
+
+    return velocities / sigma
+
+
+def _intervals(labels: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    if len(labels) == 0:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty, labels[:0]
+
+    changes = np.flatnonzero(np.diff(labels)) + 1
+    onsets = np.concatenate(([0], changes))
+    offsets = np.concatenate((changes, [len(labels)])) - 1
+    return onsets, offsets, labels[onsets]
+
+
+def _long_runs(mask: np.ndarray, min_duration: int) -> np.ndarray:
+    # Máscara con solo los tramos de al menos min_duration muestras
+    onsets, offsets, run_labels = _intervals(mask)
+    lengths = offsets - onsets + 1
+    return np.repeat(run_labels & (lengths >= min_duration), lengths)
+
+
+def _masked_mean(values: np.ndarray, mask: np.ndarray, window: int) -> np.ndarray:
+    # Media móvil de los valores en las muestras de la máscara
+    weights = mask.astype(np.float64)
+    total = uniform_filter1d(values * weights, window)
+    count = uniform_filter1d(weights, window)
+    return np.divide(total, count, out=np.zeros_like(total), where=count > 0)
+
+
+def events(
+    hor_channel: np.ndarray,
+    ver_channel: np.ndarray | None = None,
+    fixation_factor: float = 2.0,
+    saccade_factor: float = 6.0,
+    blink_factor: float = 40.0,
+    pursuit_window: int = 100,
+    min_saccade_duration: int = 10,
+    min_pursuit_duration: int = 100,
+    blink_margin: int = 50,
+) -> EventTable:
+    """Classify every sample as fixation, pursuit, saccade or blink
+
+    All the events are obtained from a single velocity profile per channel.
+    Thresholds are expressed in units of the robust (median based) standard
+    deviation of the velocity of each channel. Fixations and pursuits are told
+    apart with the mean speed over a window, as pursuits are sustained
+    movements. Saccade and blink samples are left out of that mean so they do
+    not spill into the surrounding samples. Blinks and other artifacts are
+    only searched in the vertical channel, when available, and extended by a
+    margin so their edges do not contaminate the surrounding events.
+
+    Args:
+        hor_channel (ndarray): Horizontal channel
+        ver_channel (ndarray | None, optional): Vertical channel.
+            Defaults to None.
+        fixation_factor (float, optional): Pursuit speed threshold.
+            Defaults to 2.0.
+        saccade_factor (float, optional): Saccade speed threshold.
+            Defaults to 6.0.
+        blink_factor (float, optional): Artifact speed threshold.
+            Defaults to 40.0.
+        pursuit_window (int, optional): Window of the mean speed used for
+            pursuits (in samples). Defaults to 100.
+        min_saccade_duration (int, optional): Shorter saccades are not taken
+            into account (in samples). Defaults to 10.
+        min_pursuit_duration (int, optional): Shorter pursuits are taken as
+            fixations (in samples). Defaults to 100.
+        blink_margin (int, optional): Samples added at both sides of every
+            blink. Defaults to 50.
+
+    Returns:
+        EventTable: events
+    """
+    hor_velocities = _normalized_velocities(hor_channel)
+
+    if ver_channel is not None:
+        ver_velocities = _normalized_velocities(ver_channel)
+        speed = np.hypot(hor_velocities, ver_velocities)
+        blinks = abs(ver_velocities) > blink_factor
+    else:
+        # Sin canal vertical no se distinguen los parpadeos de las sacadas
+        speed = abs(hor_velocities)
+        blinks = np.zeros(len(speed), dtype=bool)
+
+    if blinks.any():
+        size = 2 * blink_margin + 1
+        blinks = maximum_filter1d(blinks.view(np.uint8), size) > 0
+
+    saccades = speed > saccade_factor
+
+    # Las sacadas y los parpadeos no cuentan en la velocidad media
+    mean_speed = _masked_mean(speed, ~(saccades | blinks), pursuit_window)
+    pursuits = (mean_speed > fixation_factor) & ~saccades
+
+    labels = np.full(len(speed), FIXATION, dtype=np.int8)
+    labels[_long_runs(pursuits, min_pursuit_duration)] = PURSUIT
+    labels[_long_runs(saccades, min_saccade_duration)] = SACCADE
+    labels[blinks] = BLINK
+
+    return EventTable(*_intervals(labels))
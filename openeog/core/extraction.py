@@ -0,0 +1,429 @@
+"""Cohort biomarker extraction
+
+Every study file is processed in a worker process and produces one row per
+test of the requested type. Rows are written as soon as the results of a file
+arrive, tagged with the content hash of the file. The hashes of the processed
+files (also those without rows) are kept next to the output with the settings
+of the extraction, so an interrupted extraction can be resumed skipping the
+files already processed.
+"""
+
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from glob import glob
+from hashlib import sha256
+from pathlib import Path
+from time import monotonic
+from typing import Iterator
+
+import numpy as np
+from openpyxl import Workbook, load_workbook
+
+from .biomarkers import (
+    AntisaccadicBiomarkers,
+    PursuitBiomarkers,
+    SaccadicBiomarkers,
+    with_confidence_intervals,
+)
+from .io import load_study
+from .logging import log
+from .models import TestType
+
+BIOMARKERS = {
+    TestType.HorizontalSaccadic: SaccadicBiomarkers,
+    TestType.HorizontalAntisaccadic: AntisaccadicBiomarkers,
+    TestType.HorizontalPursuit: PursuitBiomarkers,
+}
+
+
+def file_hash(filepath: str) -> str:
+    """SHA-256 of the content of a file
+
+    Args:
+        filepath (str): Filepath
+
+    Returns:
+        str: Hexadecimal digest
+    """
+    digest = sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def expand_inputs(patterns: list[str]) -> list[str]:
+    """Files matching the glob patterns, without duplicates
+
+    Args:
+        patterns (list[str]): Glob patterns (or plain filepaths)
+
+    Returns:
+        list[str]: Filepaths
+    """
+    result = {}
+    for pattern in patterns:
+        for filepath in sorted(glob(pattern, recursive=True)):
+            if Path(filepath).is_file():
+                result[str(Path(filepath).resolve())] = None
+    return list(result)
+
+
+def _flatten(values: dict) -> dict:
+    # Celdas escalares de Python: las tuplas (p. ej. waveform_mse) se separan
+    result = {}
+    for key, value in values.items():
+        if isinstance(value, (tuple, list, np.ndarray)):
+            for idx, item in enumerate(value):
+                result[f"{key}_{idx}"] = np.asarray(item).item()
+        else:
+            result[key] = np.asarray(value).item()
+    return result
+
+
+def extract_file(
+    filepath: str,
+    digest: str,
+    test_type: TestType,
+    biomarkers: list[str] | None = None,
+    resamples: int = 0,
+) -> tuple[list[dict], list[str]]:
+    """Biomarkers of every test of a type of a study file
+
+    Args:
+        filepath (str): Study filepath
+        digest (str): Content hash of the file
+        test_type (TestType): Test type
+        biomarkers (list[str] | None, optional): Biomarkers to extract.
+            Defaults to None (all).
+        resamples (int, optional): Bootstrap resamples of the confidence
+            intervals. Defaults to 0 (no intervals).
+
+    Returns:
+        tuple[list[dict], list[str]]: (one row per test, description of the
+            error of every test that could not be processed)
+    """
+    Biomarkers = BIOMARKERS[test_type]
+    study = load_study(filepath)
+
+    rows = []
+    errors = []
+    for idx, test in enumerate(study):
+        if test.test_type != test_type:
+            continue
+
+        try:
+            result = Biomarkers(test, biomarkers=biomarkers)
+            if resamples:
+                values = with_confidence_intervals(result, resamples)
+            else:
+                values = result.to_dict
+        except Exception as error:
+            # Se informa desde el proceso principal, junto al fichero
+            errors.append(
+                f"test {idx} ({test.test_type.value}, {test.angle} degrees): "
+                f"{type(error).__name__}: {error}"
+            )
+            continue
+
+        rows.append(
+            {
+                "file": filepath,
+                "hash": digest,
+                "test": idx,
+                "test_type": test_type.value,
+                "angle": test.angle,
+                **_flatten(values),
+            }
+        )
+
+    return rows, errors
+
+
+def _mismatch(filepath: str) -> ValueError:
+    return ValueError(
+        f"The columns of {filepath} do not match the biomarkers being "
+        "extracted, use another output file or remove it"
+    )
+
+
+class ExtractionLog:
+    def __init__(self, output: str, settings: dict):
+        """Hashes of the files already processed into an output
+
+        Stored as JSON next to the output together with the settings of the
+        extraction. Resuming with other settings (different columns) fails
+        before any file is processed.
+
+        Args:
+            output (str): Output filepath
+            settings (dict): Extraction settings
+
+        Raises:
+            ValueError: The output was extracted with other settings
+        """
+        self._filepath = f"{output}.done"
+        self._settings = settings
+        self.hashes: set[str] = set()
+
+        # Sin salida el registro de una extracción anterior ya no vale
+        if Path(output).exists() and Path(self._filepath).exists():
+            with open(self._filepath) as f:
+                previous = json.load(f)
+
+            if previous["settings"] != settings:
+                raise ValueError(
+                    f"{output} was extracted with other settings "
+                    f"({previous['settings']}), use another output file or "
+                    "remove it"
+                )
+            self.hashes = set(previous["hashes"])
+
+    def save(self, hashes: set[str]):
+        temporary = self._filepath + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump({"settings": self._settings, "hashes": sorted(hashes)}, f)
+        os.replace(temporary, self._filepath)
+
+
+class CSVRowWriter:
+    def __init__(self, filepath: str):
+        """Append rows to a CSV file
+
+        Args:
+            filepath (str): Filepath
+        """
+        self._filepath = filepath
+        self._columns: list[str] | None = None
+        self.hashes: set[str] = set()
+
+        if Path(filepath).exists():
+            with open(filepath, newline="") as f:
+                reader = csv.DictReader(f)
+                self._columns = reader.fieldnames
+                self.hashes = {row["hash"] for row in reader}
+
+        self._file = open(filepath, "a", newline="")
+        self._writer = None
+        if self._columns:
+            self._writer = csv.DictWriter(self._file, self._columns)
+
+    def write(self, rows: list[dict]):
+        if not rows:
+            return
+
+        if self._writer is None:
+            self._columns = list(rows[0])
+            self._writer = csv.DictWriter(self._file, self._columns)
+            self._writer.writeheader()
+        elif any(list(row) != self._columns for row in rows):
+            raise _mismatch(self._filepath)
+
+        self._writer.writerows(rows)
+
+    def save(self, force: bool = False) -> bool:
+        """Flush the written rows
+
+        Args:
+            force (bool, optional): Unused, the rows are always flushed.
+                Defaults to False.
+
+        Returns:
+            bool: True
+        """
+        self._file.flush()
+        return True
+
+    def close(self):
+        self._file.close()
+
+
+class XLSXRowWriter:
+    def __init__(self, filepath: str, interval: float = 30.0):
+        """Write rows to an XLSX file
+
+        A workbook can not be appended to, so the rows (those of a previous
+        run included) are kept and the whole workbook is written again in
+        write-only mode at most every ``interval`` seconds and when closed.
+
+        Args:
+            filepath (str): Filepath
+            interval (float, optional): Minimum time between saves (in
+                seconds). Defaults to 30.0.
+        """
+        self._filepath = filepath
+        self._interval = interval
+        self._columns: list[str] | None = None
+        self._rows: list[tuple] = []
+        self._saved_at = monotonic()
+        self.hashes: set[str] = set()
+
+        if Path(filepath).exists():
+            previous = load_workbook(filepath, read_only=True)
+            rows = previous.worksheets[0].iter_rows(values_only=True)
+            self._columns = list(next(rows, None) or []) or None
+            if self._columns:
+                position = self._columns.index("hash")
+                for row in rows:
+                    self._rows.append(row)
+                    self.hashes.add(row[position])
+            previous.close()
+
+    def write(self, rows: list[dict]):
+        if not rows:
+            return
+
+        if self._columns is None:
+            self._columns = list(rows[0])
+        elif any(list(row) != self._columns for row in rows):
+            raise _mismatch(self._filepath)
+
+        for row in rows:
+            self._rows.append(tuple(row.values()))
+
+    def save(self, force: bool = False) -> bool:
+        """Save the workbook if enough time passed since the last save
+
+        Args:
+            force (bool, optional): Save anyway. Defaults to False.
+
+        Returns:
+            bool: whether the workbook was saved
+        """
+        if not force and monotonic() - self._saved_at < self._interval:
+            return False
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Biomarcadores")
+        if self._columns:
+            sheet.append(self._columns)
+        for row in self._rows:
+            sheet.append(row)
+
+        # Se guarda aparte y se reemplaza para no dejar un fichero a medias
+        temporary = self._filepath + ".tmp"
+        workbook.save(temporary)
+        os.replace(temporary, self._filepath)
+
+        self._saved_at = monotonic()
+        return True
+
+    def close(self):
+        self.save(force=True)
+
+
+def row_writer(filepath: str) -> CSVRowWriter | XLSXRowWriter:
+    """Row writer for the extension of the filepath
+
+    Args:
+        filepath (str): Filepath (.csv or .xlsx)
+
+    Returns:
+        CSVRowWriter | XLSXRowWriter: writer
+    """
+    match Path(filepath).suffix.lower():
+        case ".csv":
+            return CSVRowWriter(filepath)
+        case ".xlsx":
+            return XLSXRowWriter(filepath)
+        case suffix:
+            raise ValueError(f"Unsupported output format: {suffix}")
+
+
+def extract(
+    filepaths: list[str],
+    output: str,
+    test_type: TestType,
+    workers: int | None = None,
+    biomarkers: list[str] | None = None,
+    resamples: int = 0,
+) -> Iterator[tuple[str, int]]:
+    """Extract the biomarkers of a cohort into a CSV or XLSX file
+
+    Files already processed into the output (same content hash) are skipped.
+    Resuming into an output extracted with other settings raises an error.
+
+    Args:
+        filepaths (list[str]): Study filepaths
+        output (str): Output filepath (.csv or .xlsx)
+        test_type (TestType): Test type
+        workers (int | None, optional): Number of processes. Defaults to None.
+        biomarkers (list[str] | None, optional): Biomarkers to extract.
+            Defaults to None (all).
+        resamples (int, optional): Bootstrap resamples of the confidence
+            intervals. Defaults to 0 (no intervals).
+
+    Raises:
+        ValueError: Unknown biomarkers or the output was extracted with other
+            settings
+
+    Yields:
+        Iterator[tuple[str, int]]: (filepath, rows written) as files finish
+    """
+    # Se comprueban antes de crear la salida y de procesar ningún fichero
+    names = BIOMARKERS[test_type].BIOMARKERS
+    unknown = set(biomarkers or ()) - set(names)
+    if unknown:
+        raise ValueError(
+            f"Unknown {test_type.value} biomarkers: {', '.join(sorted(unknown))}"
+        )
+    if biomarkers:
+        # Mismas columnas sea cual sea el orden pedido
+        biomarkers = [name for name in names if name in biomarkers]
+
+    settings = {
+        "test_type": test_type.value,
+        "biomarkers": sorted(biomarkers) if biomarkers else None,
+        "resamples": resamples,
+    }
+    done = ExtractionLog(output, settings)
+    writer = row_writer(output)
+
+    # Ficheros ya procesados: los que tienen filas y los registrados
+    processed = writer.hashes | done.hashes
+
+    try:
+        pending = {}
+        for filepath in filepaths:
+            digest = file_hash(filepath)
+            if digest in processed:
+                log.info(f"Skipping already extracted {filepath}")
+                continue
+            pending[filepath] = digest
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    extract_file,
+                    filepath,
+                    digest,
+                    test_type,
+                    biomarkers,
+                    resamples,
+                ): filepath
+                for filepath, digest in pending.items()
+            }
+
+            for future in as_completed(futures):
+                filepath = futures[future]
+                try:
+                    rows, errors = future.result()
+                except Exception as error:
+                    log.error(f"Could not process {filepath}: {error}")
+                    continue
+
+                for error in errors:
+                    log.warning(f"{filepath}: skipping {error}")
+
+                writer.write(rows)
+                processed.add(pending[filepath])
+                # El registro nunca va por delante de las filas guardadas
+                if writer.save():
+                    done.save(processed)
+
+                yield filepath, len(rows)
+    finally:
+        writer.close()
+        done.save(processed)
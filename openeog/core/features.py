@@ -0,0 +1,273 @@
+"""Cohort feature tensors
+
+The biomarkers of every study of a cohort are arranged in a (subjects, tests,
+biomarkers) array, a test being identified by its type, angle and replica
+flag. Missing values (a test the subject did not perform or a biomarker of
+another test type) are NaN.
+
+With a cache directory the tensor is stored as a ``.npy`` file, returned as a
+read-only memory map, next to a JSON file with its axes and the content hash
+of every study. The file name depends on the parameters, so building again
+only processes the studies whose hash changed.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from hashlib import sha256
+from pathlib import Path
+
+import numpy as np
+
+from .extraction import BIOMARKERS, _flatten, file_hash
+from .io import load_study
+from .logging import log
+from .models import TestType
+
+TestKey = tuple[TestType, int, bool]  # (tipo, ángulo, réplica)
+StudyFeatures = dict[TestKey, dict[str, float]]
+
+
+@dataclass
+class FeatureTensor:
+    values: np.ndarray  # (subjects, tests, biomarkers)
+    subjects: list[str]
+    tests: list[TestKey]
+    biomarkers: list[str]
+
+    def test_index(
+        self,
+        test_type: TestType,
+        angle: int,
+        replica: bool = False,
+    ) -> int:
+        """Position of a test in the tests axis
+
+        Args:
+            test_type (TestType): Test type
+            angle (int): Angle
+            replica (bool, optional): Replica. Defaults to False.
+
+        Returns:
+            int: position
+        """
+        return self.tests.index((test_type, angle, replica))
+
+    def feature(self, biomarker: str) -> np.ndarray:
+        """Values of a biomarker
+
+        Args:
+            biomarker (str): Biomarker name
+
+        Returns:
+            ndarray: (subjects, tests) array
+        """
+        return self.values[:, :, self.biomarkers.index(biomarker)]
+
+
+def study_features(
+    filepath: str,
+    test_types: list[TestType],
+    parameters: dict[TestType, dict],
+) -> StudyFeatures:
+    """Biomarkers of every test of a study
+
+    Args:
+        filepath (str): Study filepath
+        test_types (list[TestType]): Test types
+        parameters (dict[TestType, dict]): Parameters of the biomarkers of
+            every test type
+
+    Returns:
+        StudyFeatures: Biomarkers by (test type, angle, replica)
+
+    Raises:
+        ValueError: Two tests of the study have the same key
+    """
+    result = {}
+    keys = set()
+    for idx, test in enumerate(load_study(filepath)):
+        if test.test_type not in test_types:
+            continue
+
+        key = (test.test_type, test.angle, test.replica)
+        if key in keys:
+            raise ValueError(
+                f"Test {idx} of {filepath} repeats the type, angle and replica "
+                f"flag of a previous test ({test.test_type.value}, {test.angle})"
+            )
+        keys.add(key)
+
+        Biomarkers = BIOMARKERS[test.test_type]
+        try:
+            values = Biomarkers(test, **parameters.get(test.test_type, {})).to_dict
+        except Exception as error:
+            log.warning(f"Skipping test {idx} of {filepath}: {error}")
+            continue
+
+        result[key] = _flatten(values)
+
+    return result
+
+
+def _cache_key(test_types: list[TestType], parameters: dict[TestType, dict]) -> str:
+    description = {
+        "test_types": sorted(test_type.value for test_type in test_types),
+        "parameters": {
+            test_type.value: values for test_type, values in parameters.items()
+        },
+    }
+    encoded = json.dumps(description, sort_keys=True, default=str).encode()
+    return sha256(encoded).hexdigest()[:16]
+
+
+def _load_cache(values_path: Path, axes_path: Path) -> tuple[np.ndarray | None, dict]:
+    if not values_path.exists() or not axes_path.exists():
+        return None, {}
+
+    with open(axes_path) as f:
+        axes = json.load(f)
+    axes["tests"] = [
+        (TestType(test_type), angle, replica)
+        for test_type, angle, replica in axes["tests"]
+    ]
+    return np.load(values_path, mmap_mode="r"), axes
+
+
+def _save_cache(values_path: Path, axes_path: Path, tensor: FeatureTensor, hashes):
+    axes = {
+        "subjects": tensor.subjects,
+        "hashes": hashes,
+        "tests": [
+            [test_type.value, angle, replica]
+            for test_type, angle, replica in tensor.tests
+        ],
+        "biomarkers": tensor.biomarkers,
+    }
+
+    # Se escribe aparte y se reemplaza para no dejar una caché a medias
+    temporary = f"{values_path}.tmp"
+    output = np.lib.format.open_memmap(
+        temporary,
+        mode="w+",
+        dtype=np.float64,
+        shape=tensor.values.shape,
+    )
+    output[:] = tensor.values
+    output.flush()
+    del output
+    os.replace(temporary, values_path)
+
+    temporary = f"{axes_path}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(axes, f)
+    os.replace(temporary, axes_path)
+
+
+def build_features(
+    filepaths: list[str],
+    test_types: list[TestType] | None = None,
+    parameters: dict[TestType, dict] | None = None,
+    cache_dir: str | None = None,
+    workers: int | None = None,
+) -> FeatureTensor:
+    """Feature tensor of a cohort
+
+    Args:
+        filepaths (list[str]): Study filepaths (one per subject)
+        test_types (list[TestType] | None, optional): Test types. Defaults to
+            None (every type with biomarkers).
+        parameters (dict[TestType, dict] | None, optional): Parameters of the
+            biomarkers of every test type. Defaults to None.
+        cache_dir (str | None, optional): Cache directory. Defaults to None
+            (no cache).
+        workers (int | None, optional): Number of processes. Defaults to None.
+
+    Returns:
+        FeatureTensor: tensor (a read-only memory map when cached)
+    """
+    test_types = list(test_types or BIOMARKERS)
+    parameters = parameters or {}
+    hashes = [file_hash(filepath) for filepath in filepaths]
+
+    cached, axes = None, {}
+    if cache_dir is not None:
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        name = f"features-{_cache_key(test_types, parameters)}"
+        values_path = Path(cache_dir) / f"{name}.npy"
+        axes_path = Path(cache_dir) / f"{name}.json"
+        cached, axes = _load_cache(values_path, axes_path)
+
+    # Filas reutilizables de la caché: mismo fichero con el mismo contenido
+    previous = {
+        (subject, digest): row
+        for row, (subject, digest) in enumerate(
+            zip(axes.get("subjects", []), axes.get("hashes", []))
+        )
+    }
+    reused = {
+        row: previous[(filepath, digest)]
+        for row, (filepath, digest) in enumerate(zip(filepaths, hashes))
+        if (filepath, digest) in previous
+    }
+    pending = [row for row in range(len(filepaths)) if row not in reused]
+
+    unchanged = len(filepaths) == len(previous) and all(
+        reused.get(row) == row for row in range(len(filepaths))
+    )
+    if cached is not None and unchanged:
+        return FeatureTensor(
+            cached,
+            axes["subjects"],
+            axes["tests"],
+            axes["biomarkers"],
+        )
+
+    log.info(f"Computing features of {len(pending)} of {len(filepaths)} studies")
+    computed = {}
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(
+                study_features,
+                [filepaths[row] for row in pending],
+                [test_types] * len(pending),
+                [parameters] * len(pending),
+            )
+            computed = dict(zip(pending, results))
+
+    # Ejes: los de la caché (si se reutiliza algo) y los de los nuevos estudios
+    tests = set(axes.get("tests", []) if reused else [])
+    biomarkers = set(axes.get("biomarkers", []) if reused else [])
+    for features in computed.values():
+        tests.update(features)
+        for values in features.values():
+            biomarkers.update(values)
+
+    tests = sorted(tests, key=lambda key: (key[0].value, key[1], key[2]))
+    biomarkers = sorted(biomarkers)
+    test_positions = {key: idx for idx, key in enumerate(tests)}
+    biomarker_positions = {name: idx for idx, name in enumerate(biomarkers)}
+
+    values = np.full((len(filepaths), len(tests), len(biomarkers)), np.nan)
+
+    if reused:
+        rows = np.fromiter(reused.keys(), np.int64)
+        old_rows = np.fromiter(reused.values(), np.int64)
+        test_map = [test_positions[key] for key in axes["tests"]]
+        biomarker_map = [biomarker_positions[name] for name in axes["biomarkers"]]
+        values[np.ix_(rows, test_map, biomarker_map)] = cached[old_rows]
+
+    for row, features in computed.items():
+        for key, biomarker_values in features.items():
+            columns = [biomarker_positions[name] for name in biomarker_values]
+            values[row, test_positions[key], columns] = list(biomarker_values.values())
+
+    tensor = FeatureTensor(values, list(filepaths), tests, biomarkers)
+
+    if cache_dir is not None:
+        del cached  # Se libera el mapa antes de reemplazar el fichero
+        _save_cache(values_path, axes_path, tensor, hashes)
+        tensor.values = np.load(values_path, mmap_mode="r")
+
+    return tensor
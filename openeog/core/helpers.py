@@ -1,4 +1,5 @@
 import numpy as np
+from scipy import fft, signal
 
 
 def scale_signal(value: np.ndarray, angle: float) -> np.ndarray:
@@ -57,3 +58,77 @@ def move(s: np.ndarray, count: int = 1) -> np.ndarray:
         ndarray: Channel
     """
     return np.hstack((np.ones(count) * s[0], s[:-count]))
+
+
+def moved_mse(reference: np.ndarray, s: np.ndarray, count: int) -> np.ndarray:
+    """MSE between the reference and the signal moved by 1 to count samples
+
+    Equivalent to ``[mse(reference, move(s, i)) for i in range(1, count + 1)]``
+    but computed at once: the error is expanded into energy terms, the cross
+    term comes from an FFT cross-correlation and the padding with the first
+    sample is accounted for with cumulative sums.
+
+    Args:
+        reference (ndarray): Channel
+        s (ndarray): Channel to move
+        count (int): Maximum displacement
+
+    Returns:
+        ndarray: MSE for every displacement (position i - 1 for displacement i)
+    """
+    reference = np.asarray(reference, dtype=np.float64)
+    s = np.asarray(s, dtype=np.float64)
+    samples = len(s)
+    shifts = np.arange(1, min(count, samples - 1) + 1)
+
+    # sum_{j >= k} reference[j] * s[j - k] para cada desplazamiento k
+    correlation = signal.correlate(reference, s, mode="full", method="fft")
+    cross = correlation[samples - 1 + shifts]
+
+    # Las primeras k muestras se rellenan con s[0]
+    first = s[0]
+    cross += first * np.cumsum(reference)[shifts - 1]
+    moved_energy = shifts * first**2 + np.cumsum(s**2)[samples - shifts - 1]
+
+    errors = np.sum(reference**2) - 2.0 * cross + moved_energy
+    return errors / samples
+
+
+def windowed_lags(
+    reference: np.ndarray,
+    s: np.ndarray,
+    starts: np.ndarray,
+    length: int,
+    max_lag: int,
+    min_lag: int | None = None,
+) -> np.ndarray:
+    """Lag of the signal with respect to the reference inside every window
+
+    The cross-correlation of all the windows is computed at once with FFTs and
+    the lag with maximum correlation is searched in [min_lag, max_lag].
+
+    Args:
+        reference (ndarray): Channel
+        s (ndarray): Channel
+        starts (ndarray): First sample of every window
+        length (int): Window length
+        max_lag (int): Maximum lag (in samples)
+        min_lag (int | None, optional): Minimum lag (in samples).
+            Defaults to -max_lag.
+
+    Returns:
+        ndarray: Lag of every window (positive when the signal is delayed)
+    """
+    idx = np.asarray(starts)[:, None] + np.arange(length)
+    reference_windows = reference[idx] - reference[idx].mean(axis=1, keepdims=True)
+    s_windows = s[idx] - s[idx].mean(axis=1, keepdims=True)
+
+    n = fft.next_fast_len(2 * length)
+    spectrum = fft.rfft(s_windows, n) * np.conj(fft.rfft(reference_windows, n))
+    correlation = fft.irfft(spectrum, n)
+
+    if min_lag is None:
+        min_lag = -max_lag
+
+    lags = np.arange(min_lag, max_lag + 1)
+    return lags[correlation[:, lags % n].argmax(axis=1)]
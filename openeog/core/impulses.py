@@ -4,6 +4,7 @@ from numpy import ndarray
 from scipy.signal import medfilt
 from sklearn.cluster import KMeans
 
+from . import backend
 from .denoising import denoise
 from .differentiation import differentiate
 
@@ -23,24 +24,8 @@ def impulses(channel: ndarray) -> Iterator[tuple[int, int]]:
     X = derived_channel.reshape((len(derived_channel), -1))
     labels = KMeans(n_clusters=2, n_init="auto").fit_predict(X)
 
-    def iterate_clusters():
-        start = None
-        for idx, label in enumerate(labels):
-            
-            if label == 1:
-                if start is None:
-                    start = idx
-            else:
-                if start is not None:
-                    yield start, idx
-                start = None
-
-    samples = len(channel)
-    for start, end in iterate_clusters():
-        while start > 0 and derived_channel[start] > derived_channel[start - 1]:
-            start -= 1
-
-        while end < samples - 1 and derived_channel[end] > derived_channel[end + 1]:
-            end += 1
-
-        yield start, end
+    starts, ends = backend.runs(labels == 1)
+    starts, ends = backend.descend_slopes(derived_channel, starts, ends)
+
+    for start, end in zip(starts, ends):
+        yield int(start), int(end)
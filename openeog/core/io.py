@@ -97,6 +97,9 @@ def load_study(filepath: str) -> Study:
                         hor_channel=channels["hor_channel"],
                         ver_stimuli=channels["ver_stimuli"],
                         ver_channel=channels["ver_channel"],
+                        fs=test.get("fs", 1000),
+                        replica=test.get("replica", False),
+                        shift=test.get("shift", 0),
                     )
                 )
 
@@ -1,4 +1,11 @@
-from .annotations import Annotation, Saccade
+from .annotations import (
+    Annotation,
+    AnnotationIndex,
+    AnnotationRow,
+    AnnotationTable,
+    AntiSaccade,
+    Saccade,
+)
 from .conditions import Conditions
 from .enums import AnnotationType, Device, Direction, Protocol, Size, TestType
 from .hardware import Hardware
@@ -14,7 +21,11 @@ from .tests import Test
 
 __all__ = [
     "Annotation",
+    "AnnotationIndex",
+    "AnnotationRow",
+    "AnnotationTable",
     "AnnotationType",
+    "AntiSaccade",
     "AntisaccadicProtocolTemplate",
     "Conditions",
     "Device",
@@ -1,9 +1,14 @@
 from .antisaccades import AntiSaccade
 from .base import Annotation
+from .index import AnnotationIndex
 from .saccades import Saccade
+from .table import AnnotationRow, AnnotationTable
 
 __all__ = [
     "Annotation",
+    "AnnotationIndex",
+    "AnnotationRow",
+    "AnnotationTable",
     "AntiSaccade",
     "Saccade",
 ]
@@ -0,0 +1,137 @@
+from typing import Iterator, TypeVar
+
+import numpy as np
+
+from .base import Annotation
+
+A = TypeVar("A", bound=Annotation)
+
+
+class AnnotationIndex:
+    def __init__(self, annotations: list[Annotation]):
+        """Sorted interval index over annotations
+
+        Annotations are sorted by onset and their onsets and offsets kept as
+        arrays, so window queries are binary searches plus the matches.
+
+        Args:
+            annotations (list[Annotation]): annotations
+        """
+        onsets = np.array([a.onset for a in annotations], dtype=np.int64)
+        order = np.argsort(onsets, kind="stable")
+
+        self.annotations = [annotations[idx] for idx in order]
+        self.onsets = onsets[order]
+        self.offsets = np.array(
+            [a.offset for a in self.annotations],
+            dtype=np.int64,
+        )
+
+        # Máximo offset hasta cada posición (y la anotación que lo alcanza):
+        # delimita los candidatos a solaparse aunque haya intervalos anidados
+        self._reach = np.maximum.accumulate(self.offsets)
+        self._reach_positions = np.maximum.accumulate(
+            np.where(self.offsets == self._reach, np.arange(len(self)), 0)
+        )
+
+        self._by_type: dict[type, list] = {}
+
+    def __len__(self) -> int:
+        return len(self.annotations)
+
+    def __iter__(self) -> Iterator[Annotation]:
+        return iter(self.annotations)
+
+    def __getitem__(self, position: int) -> Annotation:
+        return self.annotations[position]
+
+    def _select(self, low: int, high: int, mask: np.ndarray) -> list[Annotation]:
+        return [self.annotations[low + idx] for idx in np.flatnonzero(mask)]
+
+    def overlapping(self, start: int, end: int) -> list[Annotation]:
+        """Annotations that overlap a window
+
+        Args:
+            start (int): first sample of the window
+            end (int): last sample of the window
+
+        Returns:
+            list[Annotation]: annotations sorted by onset
+        """
+        if not len(self):
+            return []
+
+        low = int(np.searchsorted(self._reach, start, side="left"))
+        high = int(np.searchsorted(self.onsets, end, side="right"))
+        return self._select(low, high, self.offsets[low:high] >= start)
+
+    def containing(self, sample: int) -> list[Annotation]:
+        """Annotations that contain a sample
+
+        Args:
+            sample (int): sample
+
+        Returns:
+            list[Annotation]: annotations sorted by onset
+        """
+        return self.overlapping(sample, sample)
+
+    def within(self, start: int, end: int) -> list[Annotation]:
+        """Annotations fully inside a window
+
+        Args:
+            start (int): first sample of the window
+            end (int): last sample of the window
+
+        Returns:
+            list[Annotation]: annotations sorted by onset
+        """
+        low = int(np.searchsorted(self.onsets, start, side="left"))
+        high = int(np.searchsorted(self.onsets, end, side="right"))
+        return self._select(low, high, self.offsets[low:high] <= end)
+
+    def nearest(self, sample: int) -> Annotation | None:
+        """Annotation closest to a sample
+
+        The distance is zero for the annotations that contain the sample.
+
+        Args:
+            sample (int): sample
+
+        Returns:
+            Annotation | None: annotation (None if the index is empty)
+        """
+        if not len(self):
+            return None
+
+        containing = self.containing(sample)
+        if containing:
+            return containing[0]
+
+        # Candidatos: la que más se extiende de las que empiezan antes y la
+        # primera que empieza después
+        position = int(np.searchsorted(self.onsets, sample, side="right"))
+        candidates = []
+        if position > 0:
+            before = int(self._reach_positions[position - 1])
+            candidates.append((sample - self.offsets[before], before))
+        if position < len(self):
+            candidates.append((self.onsets[position] - sample, position))
+
+        return self.annotations[min(candidates)[1]]
+
+    def of_type(self, annotation_class: type[A]) -> list[A]:
+        """Annotations of a class (or its subclasses)
+
+        Args:
+            annotation_class (type): annotation class
+
+        Returns:
+            list: annotations sorted by onset
+        """
+        if annotation_class not in self._by_type:
+            self._by_type[annotation_class] = [
+                a for a in self.annotations if isinstance(a, annotation_class)
+            ]
+
+        return self._by_type[annotation_class]
@@ -0,0 +1,190 @@
+from typing import Iterator
+
+import numpy as np
+
+from openeog.core.models.enums import AnnotationType, Direction, Size
+
+from .antisaccades import AntiSaccade
+from .base import Annotation
+from .saccades import Saccade
+
+# Las enumeraciones se guardan como su posición en estas listas
+ANNOTATION_TYPES = list(AnnotationType)
+DIRECTIONS = list(Direction)
+SIZES = list(Size)
+
+ANNOTATION_DTYPE = np.dtype(
+    [
+        ("annotation_type", np.int8),
+        ("onset", np.int64),
+        ("offset", np.int64),
+        ("latency", np.int64),
+        ("duration", np.int64),
+        ("amplitude", np.float64),
+        ("deviation", np.float64),
+        ("peak_velocity", np.float64),
+        ("transition_index", np.int64),
+        ("transition_change_index", np.int64),
+        ("transition_change_before_index", np.int64),
+        ("transition_direction", np.int8),
+        ("direction", np.int8),
+        ("size", np.int8),
+    ]
+)
+
+ENUMS = {
+    "annotation_type": ANNOTATION_TYPES,
+    "transition_direction": DIRECTIONS,
+    "direction": DIRECTIONS,
+    "size": SIZES,
+}
+
+DEFAULTS = {
+    "latency": 0,
+    "duration": 0,
+    "amplitude": 0.0,
+    "deviation": 0.0,
+    "peak_velocity": 0.0,
+    "transition_index": -1,
+    "transition_change_index": -1,
+    "transition_change_before_index": -1,
+    "transition_direction": Direction.Same,
+    "direction": Direction.Same,
+    "size": Size.Invalid,
+}
+
+
+class AnnotationRow:
+    __slots__ = ("_row",)
+
+    def __init__(self, row: np.void):
+        """Row of an AnnotationTable with the attributes of a Saccade
+
+        The row is a view of the table: changing an attribute changes the table.
+
+        Args:
+            row (np.void): row of the structured array
+        """
+        self._row = row
+
+    def __getattr__(self, name: str):
+        if name not in ANNOTATION_DTYPE.names:
+            raise AttributeError(name)
+
+        value = self._row[name]
+        if name in ENUMS:
+            return ENUMS[name][value]
+        return value.item()
+
+    def __setattr__(self, name: str, value):
+        if name == "_row":
+            object.__setattr__(self, name, value)
+        elif name in ENUMS:
+            self._row[name] = ENUMS[name].index(value)
+        elif name in ANNOTATION_DTYPE.names:
+            self._row[name] = value
+        else:
+            raise AttributeError(name)
+
+    def __str__(self):
+        return "{annotation} from {onset} to {offset}".format(
+            annotation=self.annotation_type.value,
+            onset=self.onset,
+            offset=self.offset,
+        )
+
+    @property
+    def json(self) -> dict:
+        result = {name: getattr(self, name) for name in ANNOTATION_DTYPE.names}
+        for name in ENUMS:
+            result[name] = result[name].value
+        return result
+
+
+class AnnotationTable:
+    def __init__(self, data: np.ndarray | None = None):
+        """Columnar table of annotations
+
+        Columns are arrays (``table["latency"]``), boolean masks and slices
+        return tables and integer indexes return rows that behave like Saccade
+        objects without copying them.
+
+        Args:
+            data (ndarray | None, optional): structured array of
+                ANNOTATION_DTYPE. Defaults to None (empty table).
+        """
+        self.data = data if data is not None else np.zeros(0, ANNOTATION_DTYPE)
+
+    @classmethod
+    def from_annotations(cls, annotations: list[Annotation]) -> "AnnotationTable":
+        """Build a table from annotation objects
+
+        Args:
+            annotations (list[Annotation]): annotations
+
+        Returns:
+            AnnotationTable: table
+        """
+        data = np.zeros(len(annotations), ANNOTATION_DTYPE)
+        for name in ANNOTATION_DTYPE.names:
+            values = [
+                getattr(annotation, name, DEFAULTS.get(name))
+                for annotation in annotations
+            ]
+            if name in ENUMS:
+                values = [ENUMS[name].index(value) for value in values]
+            data[name] = values
+
+        return cls(data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __iter__(self) -> Iterator[AnnotationRow]:
+        for idx in range(len(self.data)):
+            yield AnnotationRow(self.data[idx])
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.data[key]
+
+        if isinstance(key, (int, np.integer)):
+            return AnnotationRow(self.data[key])
+
+        return AnnotationTable(self.data[key])
+
+    def of_type(self, annotation_type: AnnotationType) -> "AnnotationTable":
+        """Annotations of a type
+
+        Args:
+            annotation_type (AnnotationType): annotation type
+
+        Returns:
+            AnnotationTable: table
+        """
+        code = ANNOTATION_TYPES.index(annotation_type)
+        return self[self.data["annotation_type"] == code]
+
+    def to_annotations(self) -> list[Annotation]:
+        """Annotation objects of the table
+
+        Returns:
+            list[Annotation]: annotations
+        """
+        classes = {
+            AnnotationType.Saccade: Saccade,
+            AnnotationType.AntiSaccade: AntiSaccade,
+        }
+
+        result = []
+        for row in self:
+            values = {name: getattr(row, name) for name in ANNOTATION_DTYPE.names}
+            annotation_type = values.pop("annotation_type")
+            if annotation_type in classes:
+                result.append(classes[annotation_type](**values))
+            else:
+                result.append(
+                    Annotation(annotation_type, values["onset"], values["offset"])
+                )
+
+        return result
@@ -0,0 +1,36 @@
+from typing import Any, Callable
+
+
+class derived:
+    def __init__(self, *inputs: str):
+        """Cached property that depends on versioned inputs
+
+        The owner keeps a version counter for every input in ``_versions`` and
+        the computed values in ``_derived``. The value is recomputed only when
+        the version of one of its inputs changed since it was computed.
+
+        Args:
+            inputs (str): names of the inputs in ``_versions``
+        """
+        self.inputs = inputs
+
+    def __call__(self, function: Callable[[Any], Any]) -> "derived":
+        self.function = function
+        self.__doc__ = function.__doc__
+        return self
+
+    def __set_name__(self, owner: type, name: str):
+        self.name = name
+
+    def __get__(self, instance: Any, owner: type | None = None) -> Any:
+        if instance is None:
+            return self
+
+        versions = tuple(instance._versions[name] for name in self.inputs)
+        cached = instance._derived.get(self.name)
+        if cached is not None and cached[0] == versions:
+            return cached[1]
+
+        value = self.function(instance)
+        instance._derived[self.name] = (versions, value)
+        return value
@@ -74,6 +74,7 @@ class AnnotationType(str, Enum):
     Saccade = "Saccade"
     Pursuit = "Pursuit"
     AntiSaccade = "AntiSaccade"
+    Blink = "Blink"
 
     @property
     def name(self) -> str:
@@ -90,4 +91,7 @@ class AnnotationType(str, Enum):
             case AnnotationType.AntiSaccade:
                 return "AntiSaccade"
 
+            case AnnotationType.Blink:
+                return "Parpadeo"
+
         return "Desconocida"
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 
+import numpy as np
+
 from openeog.core.models import Protocol
 
 from .conditions import Conditions
@@ -9,6 +12,13 @@ from .hardware import Hardware
 from .tests import Test
 
 
+def _calibration(value: float | None) -> float:
+    # Sin calibración (o con una inválida, p. ej. NaN) se usa la identidad
+    if value is None or not np.isfinite(value) or value == 0:
+        return 1.0
+    return float(value)
+
+
 class Study:
     VERSION = "1.0"
 
@@ -27,14 +37,14 @@ class Study:
     ):
         self._recorded_at = recorded_at or datetime.now()
 
-        self._hor_calibration = hor_calibration or 1.0
+        self._hor_calibration = _calibration(hor_calibration)
         self._hor_calibration_diff = hor_calibration_diff
 
-        self._ver_calibration = ver_calibration or 1.0
+        self._ver_calibration = _calibration(ver_calibration)
         self._ver_calibration_diff = ver_calibration_diff
 
         for test in tests:
-            test.hor_calibration = self._hor_calibration or 1.0
+            test.hor_calibration = self._hor_calibration
 
         self._tests = tests
         self._protocol = protocol
@@ -82,10 +92,35 @@ class Study:
     def hor_calibration(self) -> float:
         return self._hor_calibration
 
+    @hor_calibration.setter
+    def hor_calibration(self, value: float):
+        # Solo se recalculan los canales de los tests, no se recarga el estudio
+        self._hor_calibration = _calibration(value)
+        for test in self._tests:
+            test.hor_calibration = self._hor_calibration
+
     @property
     def hor_calibration_diff(self) -> float:
         return self._hor_calibration_diff
 
+    @hor_calibration_diff.setter
+    def hor_calibration_diff(self, value: float | None):
+        self._hor_calibration_diff = value
+
+    @property
+    def ver_calibration(self) -> float:
+        return self._ver_calibration
+
+    @ver_calibration.setter
+    def ver_calibration(self, value: float):
+        self._ver_calibration = _calibration(value)
+        for test in self._tests:
+            test.ver_calibration = self._ver_calibration
+
+    @property
+    def ver_calibration_diff(self) -> float:
+        return self._ver_calibration_diff
+
     @property
     def protocol(self) -> Protocol:
         return self._protocol
@@ -118,3 +153,23 @@ class Study:
         if self.samples_count and self.conditions:
             return (self.conditions.errors / self.samples_count) * 100.0
         return 0.0
+
+    def annotate(self, workers: int | None = None, processes: bool = False):
+        """Identify the annotations of every test concurrently
+
+        Each test is annotated with the detector of its type. Threads are used
+        by default as most of the work is done by NumPy and SciPy, processes
+        can be used instead for the Python heavy detectors.
+
+        Args:
+            workers (int | None, optional): Number of workers. Defaults to None.
+            processes (bool, optional): Use a process pool. Defaults to False.
+        """
+        Executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+
+        with Executor(max_workers=workers) as executor:
+            results = list(executor.map(Test.detect_annotations, self._tests))
+
+        for test, test_annotations in zip(self._tests, results):
+            if test_annotations is not None:
+                test.hor_annotations = test_annotations
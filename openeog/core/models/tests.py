@@ -1,10 +1,12 @@
-from functools import cached_property
+from copy import copy
 
 import numpy as np
 
-from openeog.core.saccades import saccades
+from openeog.core.epochs import Epochs
+from openeog.core.stimuli import transitions
 
-from .annotations import Annotation, Saccade
+from .annotations import Annotation, AnnotationIndex, Saccade
+from .caching import derived
 from .enums import TestType
 
 
@@ -21,12 +23,14 @@ class Test:
         ver_annotations: list[Annotation] = [],
         fs: int = 1000,
         replica: bool = False,
+        shift: int = 0,
         **kwargs,
     ):
         self._test_type = test_type
         self._angle = angle
         self._fs = fs
         self._replica = replica
+        self._shift = shift
 
         self._hor_stimuli = hor_stimuli
         self._hor_channel = hor_channel  # In muV
@@ -38,6 +42,22 @@ class Test:
         self._hor_calibration: float = 1.0
         self._ver_calibration: float = 1.0
 
+        # Versiones de las entradas de los valores derivados
+        self._versions = dict.fromkeys(
+            (
+                "hor_stimuli",
+                "hor_channel",
+                "ver_stimuli",
+                "ver_channel",
+                "hor_calibration",
+                "ver_calibration",
+                "hor_annotations",
+                "ver_annotations",
+            ),
+            0,
+        )
+        self._derived: dict = {}
+
     def __str__(self):
         if self._replica:
             return "{test} at {angle}° (Replica)".format(
@@ -57,6 +77,7 @@ class Test:
             "angle": self._angle,
             "fs": self._fs,
             "replica": self._replica,
+            "shift": self._shift,
             "length": self.length,
             "hor_annotations": [a.json for a in self._hor_annotations],
             "ver_annotations": [a.json for a in self._ver_annotations],
@@ -78,7 +99,15 @@ class Test:
     def fs(self) -> int:
         return self._fs
 
-    @cached_property
+    @property
+    def replica(self) -> bool:
+        return self._replica
+
+    @property
+    def shift(self) -> int:
+        return self._shift
+
+    @derived("hor_stimuli")
     def hor_stimuli(self) -> np.ndarray:
         converted = self._hor_stimuli.astype(np.single)
         centered = converted - converted.mean()
@@ -93,7 +122,7 @@ class Test:
     def hor_stimuli_raw(self) -> np.ndarray:
         return self._hor_stimuli
 
-    @cached_property
+    @derived("hor_channel", "hor_calibration")
     def hor_channel(self) -> np.ndarray:
         # In Degrees
         scaled = self._hor_channel.astype(np.single) * self._hor_calibration
@@ -105,7 +134,7 @@ class Test:
         # In muV
         return self._hor_channel
 
-    @cached_property
+    @derived("ver_stimuli")
     def ver_stimuli(self) -> np.ndarray:
         converted = self._ver_stimuli.astype(np.single)
         centered = converted - converted.mean()
@@ -120,7 +149,7 @@ class Test:
     def ver_stimuli_raw(self) -> np.ndarray:
         return self._ver_stimuli
 
-    @cached_property
+    @derived("ver_channel", "hor_calibration")
     def ver_channel(self) -> np.ndarray:
         scaled = self._ver_channel.astype(np.single) * self._hor_calibration
         centered = scaled - scaled.mean()
@@ -134,21 +163,42 @@ class Test:
     def hor_annotations(self) -> list[Annotation]:
         return self._hor_annotations
 
+    @hor_annotations.setter
+    def hor_annotations(self, value: list[Annotation]):
+        self._hor_annotations = value
+        self._versions["hor_annotations"] += 1
+
+    @derived("hor_annotations")
+    def hor_index(self) -> AnnotationIndex:
+        return AnnotationIndex(self._hor_annotations)
+
     @property
     def hor_saccades(self) -> list[Saccade]:
-        return [a for a in self._hor_annotations if isinstance(a, Saccade)]
+        return self.hor_index.of_type(Saccade)
 
     @property
     def ver_annotations(self) -> list[Annotation]:
         return self._ver_annotations
 
+    @ver_annotations.setter
+    def ver_annotations(self, value: list[Annotation]):
+        self._ver_annotations = value
+        self._versions["ver_annotations"] += 1
+
+    @derived("ver_annotations")
+    def ver_index(self) -> AnnotationIndex:
+        return AnnotationIndex(self._ver_annotations)
+
     @property
     def hor_calibration(self) -> float:
         return self._hor_calibration
 
     @hor_calibration.setter
     def hor_calibration(self, value: float):
-        self._hor_calibration = value or 1.0
+        value = value or 1.0
+        if value != self._hor_calibration:
+            self._hor_calibration = value
+            self._versions["hor_calibration"] += 1
 
     @property
     def ver_calibration(self) -> float:
@@ -156,23 +206,196 @@ class Test:
 
     @ver_calibration.setter
     def ver_calibration(self, value: float):
-        self._ver_calibration = value or 1.0
+        value = value or 1.0
+        if value != self._ver_calibration:
+            self._ver_calibration = value
+            self._versions["ver_calibration"] += 1
+
+    def update(
+        self,
+        hor_stimuli: np.ndarray | None = None,
+        hor_channel: np.ndarray | None = None,
+        ver_stimuli: np.ndarray | None = None,
+        ver_channel: np.ndarray | None = None,
+    ):
+        """Replace raw arrays of the test
+
+        Only the derived values that depend on the replaced arrays are
+        recomputed the next time they are used.
+
+        Args:
+            hor_stimuli (ndarray | None, optional): Horizontal stimuli.
+                Defaults to None.
+            hor_channel (ndarray | None, optional): Horizontal channel (in muV).
+                Defaults to None.
+            ver_stimuli (ndarray | None, optional): Vertical stimuli.
+                Defaults to None.
+            ver_channel (ndarray | None, optional): Vertical channel (in muV).
+                Defaults to None.
+        """
+        arrays = {
+            "hor_stimuli": hor_stimuli,
+            "hor_channel": hor_channel,
+            "ver_stimuli": ver_stimuli,
+            "ver_channel": ver_channel,
+        }
+        for name, array in arrays.items():
+            if array is not None:
+                setattr(self, f"_{name}", array)
+                self._versions[name] += 1
+
+    def epochs(self, channel: np.ndarray, pre: int = 200, post: int = 800) -> Epochs:
+        """Windows of a channel around the horizontal stimulus transitions
+
+        Args:
+            channel (ndarray): Channel (or any signal derived from it, e.g. its
+                velocity)
+            pre (int, optional): Samples before the transition. Defaults to 200.
+            post (int, optional): Samples from the transition. Defaults to 800.
+
+        Returns:
+            Epochs: trials
+        """
+        return Epochs(channel, *transitions(self._hor_stimuli), pre=pre, post=post)
+
+    def apply_shift(self, samples: int):
+        """Shift the channels with respect to the stimuli
+
+        The arrays are replaced by views, no data is copied. A positive shift
+        drops the first samples of the channels and the last ones of the
+        stimuli (the channels are delayed), a negative one does the opposite.
+        The annotations are moved to the new origins, keeping their references
+        to the same stimulus changes (their latency is measured again), and the
+        ones that fall outside the shortened signals are dropped.
+
+        Args:
+            samples (int): Shift (in samples)
+        """
+        if samples > 0:
+            channels = slice(samples, None)
+            stimuli = slice(None, -samples)
+        elif samples < 0:
+            channels = slice(None, samples)
+            stimuli = slice(-samples, None)
+        else:
+            return
+
+        hor_annotations = _shift_annotations(
+            self._hor_annotations,
+            self._hor_stimuli,
+            samples,
+        )
+        ver_annotations = _shift_annotations(
+            self._ver_annotations,
+            self._ver_stimuli,
+            samples,
+        )
+
+        self.update(
+            hor_stimuli=self._hor_stimuli[stimuli],
+            hor_channel=self._hor_channel[channels],
+            ver_stimuli=self._ver_stimuli[stimuli],
+            ver_channel=self._ver_channel[channels],
+        )
+        self.hor_annotations = hor_annotations
+        self.ver_annotations = ver_annotations
+
+        self._shift += samples
+
+    def detect_annotations(self) -> list[Annotation] | None:
+        """Detect the horizontal annotations with the detector of the test type
+
+        Returns:
+            list[Annotation] | None: annotations (None if the test type has no
+                detector)
+        """
+        # Importación diferida: los biomarcadores dependen de los modelos
+        from openeog.core.biomarkers import (
+            AntisaccadicBiomarkers,
+            PursuitBiomarkers,
+            SaccadicBiomarkers,
+        )
+
+        match self.test_type:
+            case TestType.HorizontalSaccadic:
+                return SaccadicBiomarkers(self, detect=True).saccades
+
+            case TestType.HorizontalAntisaccadic:
+                biomarkers = AntisaccadicBiomarkers(self)
+                annotations = biomarkers.annotations
+
+                for annotation in annotations:
+                    annotation.transition_change_index += biomarkers.to_cut
+                    annotation.transition_change_before_index += biomarkers.to_cut
+
+            case TestType.HorizontalPursuit:
+                biomarkers = PursuitBiomarkers(self)
+                annotations = biomarkers.saccades
+
+            case _:
+                return None
+
+        # Los biomarcadores trabajan sobre los canales recortados
+        for annotation in annotations:
+            annotation.onset += biomarkers.to_cut
+            annotation.offset += biomarkers.to_cut
+
+        return annotations
 
     def annotate(self):
         """Identify annotations"""
+        annotations = self.detect_annotations()
+        if annotations is not None:
+            self.hor_annotations = annotations
+
+
+def _shift_annotations(
+    annotations: list[Annotation],
+    stimuli: np.ndarray,
+    samples: int,
+) -> list[Annotation]:
+    # Orígenes de los canales y de los estímulos tras el desplazamiento
+    channel_origin = max(samples, 0)
+    stimuli_origin = max(-samples, 0)
+    length = len(stimuli) - abs(samples)
+
+    # Cambios del estímulo que se pierden al recortar su principio
+    changes, _ = transitions(stimuli)
+    dropped = int(np.searchsorted(changes, stimuli_origin, side="right"))
+
+    def change(index: int) -> int:
+        # Un cambio es la primera muestra tras él, no puede ser la primera
+        index -= stimuli_origin
+        return index if 1 <= index < length else -1
+
+    result = []
+    for original in annotations:
+        # Las anotaciones del llamador no se modifican
+        annotation = copy(original)
+        annotation.onset -= channel_origin
+        annotation.offset -= channel_origin
+        if annotation.onset < 0 or annotation.offset >= length:
+            continue
+
+        if isinstance(annotation, Saccade) and annotation.transition_index >= 0:
+            annotation.transition_index -= dropped
+            annotation.transition_change_index = change(
+                annotation.transition_change_index
+            )
+            annotation.transition_change_before_index = change(
+                annotation.transition_change_before_index
+            )
+            annotation.latency -= samples
 
-        if self.test_type == TestType.HorizontalSaccadic:
-            result = []
-
-            for onset, offset in saccades(
-                channel=self.hor_channel,
-                angle=self.angle,
+            if (
+                annotation.transition_index < 0
+                or annotation.transition_change_before_index < 0
             ):
-                result.append(
-                    Saccade(
-                        onset=onset,
-                        offset=offset,
-                    )
-                )
-
-            self._hor_annotations = result
+                # El cambio que precede a la sácada ya no está en el estímulo
+                annotation.transition_index = -1
+                annotation.transition_change_before_index = -1
+                annotation.latency = 0
+
+        result.append(annotation)
+
+    return result
@@ -1,33 +1,20 @@
-from dataclasses import dataclass, field
+import csv
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
 
 from numpy import mean, std
-from tablib import Databook, Dataset
+from openpyxl import Workbook
 
-from .models import Saccade, Study, Test, TestType
+from .biomarkers import SaccadicBiomarkers
+from .models import AnnotationTable, Study, Test, TestType
 
 
 @dataclass
 class _Stats:
     test: str
-    latencies: list[int] = field(default_factory=list)
-    durations: list[int] = field(default_factory=list)
-    amplitudes: list[float] = field(default_factory=list)
-    deviations: list[float] = field(default_factory=list)
-    peak_velocities: list[float] = field(default_factory=list)
-
-    def add_sample(
-        self,
-        latency: int,
-        duration: int,
-        amplitude: float,
-        deviation: float,
-        peak_velocity: float,
-    ):
-        self.latencies.append(latency)
-        self.durations.append(duration)
-        self.amplitudes.append(amplitude)
-        self.deviations.append(deviation)
-        self.peak_velocities.append(peak_velocity)
+    saccades: AnnotationTable
 
     @classmethod
     def headers(cls) -> list[str]:
@@ -47,29 +34,147 @@ class _Stats:
 
     @property
     def row(self) -> list[int | float]:
+        latencies = self.saccades["latency"]
+        durations = self.saccades["duration"]
+        amplitudes = self.saccades["amplitude"]
+        deviations = self.saccades["deviation"]
+        peak_velocities = self.saccades["peak_velocity"]
+
         return [
             self.test,
-            int(mean(self.latencies)),
-            int(std(self.latencies)),
-            int(mean(self.durations)),
-            int(std(self.durations)),
-            float(mean(self.amplitudes)),
-            float(std(self.amplitudes)),
-            float(mean(self.deviations)),
-            float(std(self.deviations)),
-            float(mean(self.peak_velocities)),
-            float(std(self.peak_velocities)),
+            int(mean(latencies)),
+            int(std(latencies)),
+            int(mean(durations)),
+            int(std(durations)),
+            float(mean(amplitudes)),
+            float(std(amplitudes)),
+            float(mean(deviations)),
+            float(std(deviations)),
+            float(mean(peak_velocities)),
+            float(std(peak_velocities)),
         ]
 
 
-def _test_dataset(test: Test) -> tuple[Dataset, _Stats]:
+class XLSXReportWriter:
+    def __init__(self, filepath: str):
+        """Write a report as an XLSX workbook
+
+        The workbook is in write-only mode: the rows of every sheet are
+        streamed to temporary files and assembled when the writer is closed.
+
+        Args:
+            filepath (str): Filepath
+        """
+        self._filepath = filepath
+        self._workbook = Workbook(write_only=True)
+
+    def __enter__(self) -> "XLSXReportWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Un informe incompleto no llega a guardarse
+        if exc_type is None:
+            self.close()
+
+    def sheet(self, title: str, headers: list[str]) -> Callable[[list], None]:
+        """Add a sheet
+
+        Args:
+            title (str): Sheet title
+            headers (list[str]): Column names
+
+        Returns:
+            Callable[[list], None]: function that appends a row to the sheet
+        """
+        sheet = self._workbook.create_sheet(title)
+        sheet.append(headers)
+        return sheet.append
+
+    def close(self):
+        # Se guarda aparte y se reemplaza para no dejar un fichero a medias
+        temporary = self._filepath + ".tmp"
+        self._workbook.save(temporary)
+        os.replace(temporary, self._filepath)
+
+
+class CSVReportWriter:
+    def __init__(self, directory: str):
+        """Write a report as a directory with a CSV file per sheet
+
+        Args:
+            directory (str): Directory (created if needed)
+        """
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._files = []
+        self._titles: set[str] = set()
+
+    def __enter__(self) -> "CSVReportWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def sheet(self, title: str, headers: list[str]) -> Callable[[list], None]:
+        """Add a sheet
+
+        Repeated titles get a counter appended, like the sheets of the XLSX
+        writer, so every sheet has its own file.
+
+        Args:
+            title (str): Sheet title (file name without extension)
+            headers (list[str]): Column names
+
+        Returns:
+            Callable[[list], None]: function that appends a row to the sheet
+        """
+        name, count = title, 0
+        while name in self._titles:
+            count += 1
+            name = f"{title}{count}"
+        self._titles.add(name)
+
+        f = open(self._directory / f"{name}.csv", "w", newline="")
+        self._files.append(f)
+
+        writer = csv.writer(f)
+        writer.writerow(headers)
+        return writer.writerow
+
+    def close(self):
+        for f in self._files:
+            f.close()
+
+
+def report_writer(filepath: str) -> XLSXReportWriter | CSVReportWriter:
+    """Report writer for the extension of the filepath
+
+    Args:
+        filepath (str): Filepath (.xlsx) or directory (no extension)
+
+    Returns:
+        XLSXReportWriter | CSVReportWriter: writer
+    """
+    match Path(filepath).suffix.lower():
+        case ".xlsx":
+            return XLSXReportWriter(filepath)
+        case "":
+            return CSVReportWriter(filepath)
+        case suffix:
+            raise ValueError(f"Unsupported report format: {suffix}")
+
+
+def _test_sheet(
+    writer: XLSXReportWriter | CSVReportWriter,
+    test: Test,
+) -> _Stats:
     test_name = "{test} {angle}".format(
         test=test.test_type.name,
         angle=test.angle,
     )
-    ds = Dataset(
-        title=test_name,
-        headers=[
+    append = writer.sheet(
+        test_name,
+        [
             "#",
             "Inicio",
             "Fin",
@@ -80,92 +185,53 @@ def _test_dataset(test: Test) -> tuple[Dataset, _Stats]:
             "Velocidad Máxima (°/s)",
         ],
     )
-    stats = _Stats(
-        test=test_name,
-    )
-
-    saccade: Saccade
-    for idx, saccade in enumerate(test.hor_saccades):
-        ds.append(
-            [
-                idx + 1,
-                saccade.onset,
-                saccade.offset,
-                saccade.latency,
-                saccade.duration,
-                saccade.amplitude,
-                saccade.deviation,
-                saccade.peak_velocity,
-            ]
-        )
-
-        stats.add_sample(
-            saccade.latency,
-            saccade.duration,
-            saccade.amplitude,
-            saccade.deviation,
-            saccade.peak_velocity,
+    saccades = SaccadicBiomarkers(test).table
+
+    columns = [
+        saccades[name].tolist()
+        for name in (
+            "onset",
+            "offset",
+            "latency",
+            "duration",
+            "amplitude",
+            "deviation",
+            "peak_velocity",
         )
+    ]
+    for idx, values in enumerate(zip(*columns)):
+        append([idx + 1, *values])
 
-    return ds, stats
-
-
-def _metadata_dataset(study: Study) -> Dataset:
-    ds = Dataset(
-        title="Estudio",
-        headers=[
-            "Campo",
-            "Valor",
-        ],
+    return _Stats(
+        test=test_name,
+        saccades=saccades,
     )
 
-    ds.append(["Fecha", study.recorded_at])
-    ds.append(["Cantidad de Pruebas", len(study) - 2])
-    ds.append(["Calibración Horizontal", study.hor_calibration])
-    ds.append(["Calibración Horizontal Dif", study.hor_calibration_diff])
-
-    return ds
-
 
-def _stats_dataset(stats: list[_Stats]) -> Dataset:
-    ds = Dataset(
-        title="Estadísticas",
-        headers=_Stats.headers(),
-    )
-
-    for stats in stats:
-        ds.append(stats.row)
+def _metadata_sheet(writer: XLSXReportWriter | CSVReportWriter, study: Study):
+    append = writer.sheet("Estudio", ["Campo", "Valor"])
 
-    return ds
+    append(["Fecha", study.recorded_at])
+    append(["Cantidad de Pruebas", len(study) - 2])
+    append(["Calibración Horizontal", study.hor_calibration])
+    append(["Calibración Horizontal Dif", study.hor_calibration_diff])
 
 
 def saccadic_report(study: Study, filepath: str):
     """Create a saccadic report.
 
+    The extension selects the format: an XLSX workbook (.xlsx) or a directory
+    with a CSV file per sheet (no extension). Rows are written as the tests
+    are processed, the report is never held in memory as a whole.
+
     Args:
         study (Study): Study.
         filepath (str): Filepath.
     """
-    tests_list = []
-    stats_list = []
-
-    for test in study:
-        if test.test_type == TestType.HorizontalSaccadic:
-            ds, stats = _test_dataset(test)
-            tests_list.append(ds)
-            stats_list.append(stats)
-
-    study_ds = _metadata_dataset(study)
-
-    workbook = Databook()
-    workbook.add_sheet(study_ds)
-    workbook.add_sheet(_stats_dataset(stats_list))
-
-    for test in tests_list:
-        workbook.add_sheet(test)
-
-    if not filepath.lower().endswith(".xlsx"):
-        filepath += ".xlsx"
+    with report_writer(filepath) as writer:
+        _metadata_sheet(writer, study)
+        append_stats = writer.sheet("Estadísticas", _Stats.headers())
 
-    with open(filepath, "wb") as f:
-        f.write(workbook.export("xlsx"))
+        for test in study:
+            if test.test_type == TestType.HorizontalSaccadic:
+                append_stats(_test_sheet(writer, test).row)
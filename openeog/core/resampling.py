@@ -0,0 +1,222 @@
+"""Sampling rate conversion of tests and studies
+
+Channels are resampled with a polyphase filter (``resample_poly``), the
+anti-aliasing filter of every rational factor is designed once and cached.
+Stimuli are not filtered: integer stimuli (saccadic) are held so their
+transitions stay sharp steps, float stimuli (pursuit) are interpolated.
+Annotation indices are rescaled to the new rate with the same mapping as the
+held stimuli (a sample k goes to the first new sample at or after it), so the
+annotations and the stimulus transitions stay aligned.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy
+from fractions import Fraction
+from functools import lru_cache
+
+import numpy as np
+from scipy import signal
+
+from .models import Annotation, Study, Test
+
+# Posiciones de las anotaciones expresadas en muestras
+INDEX_ATTRIBUTES = (
+    "onset",
+    "offset",
+    "transition_change_index",
+    "transition_change_before_index",
+)
+
+# Longitudes de las anotaciones expresadas en muestras y las posiciones entre
+# las que se miden
+LENGTH_ATTRIBUTES = {
+    "latency": ("transition_change_before_index", "onset"),
+    "duration": ("onset", "offset"),
+}
+
+
+def _resample_index(value: int, up: int, down: int) -> int:
+    # Primera muestra nueva en o tras la muestra original
+    return -(-value * up // down)
+
+
+def resampling_factors(fs: float, target_fs: float) -> tuple[int, int]:
+    """Rational factors that convert between two sampling rates
+
+    Args:
+        fs (float): Original sampling frequency
+        target_fs (float): Target sampling frequency
+
+    Returns:
+        tuple[int, int]: (up, down)
+    """
+    ratio = (Fraction(target_fs) / Fraction(fs)).limit_denominator(1000)
+    return ratio.numerator, ratio.denominator
+
+
+@lru_cache
+def resampling_filter(up: int, down: int) -> np.ndarray:
+    """Anti-aliasing filter of a rational resampling factor
+
+    Same design as ``resample_poly`` with its default Kaiser window.
+
+    Args:
+        up (int): Upsampling factor
+        down (int): Downsampling factor
+
+    Returns:
+        ndarray: FIR coefficients
+    """
+    max_rate = max(up, down)
+    half_length = 10 * max_rate
+    coefficients = signal.firwin(
+        2 * half_length + 1,
+        1.0 / max_rate,
+        window=("kaiser", 5.0),
+    )
+    coefficients.setflags(write=False)  # Compartido por la caché
+    return coefficients
+
+
+def resample_channel(channel: np.ndarray, up: int, down: int) -> np.ndarray:
+    """Resample a channel with a polyphase filter
+
+    Args:
+        channel (ndarray): Channel
+        up (int): Upsampling factor
+        down (int): Downsampling factor
+
+    Returns:
+        ndarray: Resampled channel
+    """
+    if up == down:
+        return channel
+
+    return signal.resample_poly(
+        np.asarray(channel, dtype=np.float64),
+        up,
+        down,
+        window=resampling_filter(up, down),
+    )
+
+
+def resample_stimuli(stimuli: np.ndarray, up: int, down: int) -> np.ndarray:
+    """Resample a stimulus without filtering it
+
+    Args:
+        stimuli (ndarray): Stimuli
+        up (int): Upsampling factor
+        down (int): Downsampling factor
+
+    Returns:
+        ndarray: Resampled stimuli (same length as the resampled channels)
+    """
+    if up == down:
+        return stimuli
+
+    length = -(-len(stimuli) * up // down)
+
+    if np.issubdtype(stimuli.dtype, np.integer):
+        # La muestra nueva n retiene la original floor(n * down / up), así un
+        # cambio en la muestra k pasa a ceil(k * up / down), como las anotaciones
+        indexes = np.arange(length, dtype=np.int64) * down // up
+        return stimuli[np.minimum(indexes, len(stimuli) - 1)]
+
+    positions = np.arange(length) * down / up
+    return np.interp(positions, np.arange(len(stimuli)), stimuli).astype(stimuli.dtype)
+
+
+def resample_annotation(annotation: Annotation, up: int, down: int) -> Annotation:
+    """Copy of the annotation with its sample indices in the new rate
+
+    Args:
+        annotation (Annotation): Annotation
+        up (int): Upsampling factor
+        down (int): Downsampling factor
+
+    Returns:
+        Annotation: Resampled annotation
+    """
+    result = copy(annotation)
+    for name in INDEX_ATTRIBUTES:
+        value = getattr(annotation, name, None)
+        # Los índices negativos indican que no hay transición asociada
+        if value is not None and value >= 0:
+            setattr(result, name, _resample_index(value, up, down))
+
+    # Las longitudes se calculan de nuevo a partir de las posiciones ya
+    # convertidas, así siguen coincidiendo con su diferencia
+    for name, (start, end) in LENGTH_ATTRIBUTES.items():
+        value = getattr(annotation, name, None)
+        if value is None:
+            continue
+
+        start_value = getattr(annotation, start, -1)
+        end_value = getattr(annotation, end, -1)
+        if start_value >= 0 and value == end_value - start_value:
+            setattr(result, name, getattr(result, end) - getattr(result, start))
+        elif value >= 0:
+            setattr(result, name, _resample_index(value, up, down))
+
+    return result
+
+
+def resample_test(test: Test, fs: float) -> Test:
+    """Copy of the test at another sampling rate
+
+    Args:
+        test (Test): Test
+        fs (float): Target sampling frequency
+
+    Returns:
+        Test: Resampled test
+    """
+    up, down = resampling_factors(test.fs, fs)
+
+    result = Test(
+        test_type=test.test_type,
+        angle=test.angle,
+        hor_stimuli=resample_stimuli(test.hor_stimuli_raw, up, down),
+        hor_channel=resample_channel(test.hor_channel_raw, up, down),
+        ver_stimuli=resample_stimuli(test.ver_stimuli_raw, up, down),
+        ver_channel=resample_channel(test.ver_channel_raw, up, down),
+        hor_annotations=[
+            resample_annotation(a, up, down) for a in test.hor_annotations
+        ],
+        ver_annotations=[
+            resample_annotation(a, up, down) for a in test.ver_annotations
+        ],
+        fs=fs,
+        replica=test.replica,
+        shift=round(test.shift * up / down),
+    )
+    result.hor_calibration = test.hor_calibration
+    result.ver_calibration = test.ver_calibration
+    return result
+
+
+def resample_study(study: Study, fs: float, workers: int | None = None) -> Study:
+    """Copy of the study with every test at another sampling rate
+
+    Args:
+        study (Study): Study
+        fs (float): Target sampling frequency
+        workers (int | None, optional): Number of threads. Defaults to None.
+
+    Returns:
+        Study: Resampled study
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        tests = list(executor.map(lambda test: resample_test(test, fs), study))
+
+    return Study(
+        recorded_at=study.recorded_at,
+        protocol=study.protocol,
+        tests=tests,
+        hardware=study.hardware,
+        conditions=study.conditions,
+        hor_calibration=study.hor_calibration,
+        hor_calibration_diff=study.hor_calibration_diff,
+        ver_calibration=study.ver_calibration,
+        ver_calibration_diff=study.ver_calibration_diff,
+    )
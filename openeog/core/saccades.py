@@ -2,6 +2,7 @@ from typing import Iterator
 
 from numpy import ndarray
 
+from . import backend
 from .denoising import denoise_35
 from .differentiation import differentiate
 
@@ -24,33 +25,16 @@ def saccades(
     velocities = differentiate(denoise_35(channel))
     threshold = velocities.std()
     velocities = abs(velocities)
-    right = len(channel) - 1
 
     delta_amplitude = angle * tolerance
     min_amplitude, max_amplitude = angle - delta_amplitude, angle + delta_amplitude
 
-    idx = 0
-    onset = None
-    offset = None
-    while idx <= right:
-        if velocities[idx] > threshold:
-            if onset is None:
-                onset = idx
-            offset = idx
-        elif onset is not None:
-            while onset > 0 and velocities[onset] > velocities[onset - 1]:
-                onset -= 1
+    onsets, offsets = backend.runs(velocities > threshold)
+    onsets, offsets = backend.descend_slopes(velocities, onsets, offsets - 1)
 
-            while offset < right and velocities[offset] > velocities[offset + 1]:
-                offset += 1
+    for onset, offset in zip(onsets, offsets):
+        window = channel[onset : offset + 1]
+        amplitude = window.max() - window.min()
 
-            window = channel[onset : offset + 1]
-            amplitude = window.max() - window.min()
-
-            if min_amplitude <= amplitude <= max_amplitude:
-                yield onset, offset
-
-            onset = None
-            offset = None
-
-        idx += 1
+        if min_amplitude <= amplitude <= max_amplitude:
+            yield int(onset), int(offset)
@@ -76,18 +76,27 @@ def pursuit_stimuli(
     return y
 
 
+def transitions(stimuli: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Changes of a saccadic stimulus
+
+    Args:
+        stimuli (ndarray): Saccadic stimulus
+
+    Returns:
+        tuple[ndarray, ndarray]: (first sample after every change, sign of
+            every change: 1 when the stimulus increases, -1 otherwise)
+    """
+    steps = np.diff(np.asarray(stimuli, dtype=np.float64))
+    changes = np.flatnonzero(steps)
+    return changes + 1, np.sign(steps[changes]).astype(np.int8)
+
+
 class SaccadicStimuliTransitions:
     def __init__(self, stimuli: np.ndarray):
-        self.transitions = []
-        for idx in range(1, len(stimuli)):
-            if stimuli[idx - 1] != stimuli[idx]:
-                before_value = stimuli[idx - 1]
-                after_value = stimuli[idx]
-
-                if before_value < after_value:
-                    self.transitions.append((idx, Direction.Left))
-                else:
-                    self.transitions.append((idx, Direction.Right))
+        self.transitions = [
+            (int(idx), Direction.Left if sign > 0 else Direction.Right)
+            for idx, sign in zip(*transitions(stimuli))
+        ]
 
     def __len__(self) -> int:
         return len(self.transitions)
@@ -0,0 +1,66 @@
+from argparse import ArgumentParser
+
+from openeog.core.extraction import expand_inputs, extract
+from openeog.core.logging import log
+from openeog.core.models import TestType
+
+TEST_TYPES = {
+    "saccadic": TestType.HorizontalSaccadic,
+    "antisaccadic": TestType.HorizontalAntisaccadic,
+    "pursuit": TestType.HorizontalPursuit,
+}
+
+
+def main():
+    parser = ArgumentParser(
+        description="Extract the biomarkers of every test of a cohort of studies",
+    )
+    parser.add_argument("test_type", choices=list(TEST_TYPES))
+    parser.add_argument("output", help="output file (.csv or .xlsx)")
+    parser.add_argument("inputs", nargs="+", help="study files or glob patterns")
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=None,
+        help="number of processes (defaults to the number of CPUs)",
+    )
+    parser.add_argument(
+        "-b",
+        "--biomarkers",
+        nargs="+",
+        default=None,
+        help="biomarkers to extract (defaults to all)",
+    )
+    parser.add_argument(
+        "--bootstrap",
+        type=int,
+        default=0,
+        metavar="RESAMPLES",
+        help="add bootstrap confidence intervals with this many resamples",
+    )
+    args = parser.parse_args()
+
+    filepaths = expand_inputs(args.inputs)
+    log.info(f"Extracting {args.test_type} biomarkers of {len(filepaths)} studies")
+
+    try:
+        for count, (filepath, rows) in enumerate(
+            extract(
+                filepaths,
+                args.output,
+                TEST_TYPES[args.test_type],
+                args.workers,
+                args.biomarkers,
+                args.bootstrap,
+            ),
+            start=1,
+        ):
+            log.info(f"[{count}] {filepath}: {rows} tests")
+    except ValueError as error:
+        # Salida incompatible con la extracción pedida
+        parser.error(str(error))
+
+
+if __name__ == "__main__":
+    main()
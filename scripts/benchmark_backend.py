@@ -0,0 +1,137 @@
+#!env python
+"""Parity check and benchmark table of the boundary walking kernels
+
+Runs every kernel of ``openeog.core.backend`` with every available backend over
+a synthetic velocity profile, checks that all of them return exactly the same
+boundaries as the reference loops and prints the timings per kernel. Before
+that, the kernels are compared with the reference loops over many small random
+channels with plateaus and seeds on the edges, which exercises the NumPy
+kernels of the Python backend whether Numba is installed or not.
+"""
+
+from argparse import ArgumentParser
+from time import perf_counter
+
+import numpy as np
+
+from openeog.core import backend
+
+
+def velocity_profile(samples: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    # Ruido de fondo con impulsos sacádicos cada segundo aproximadamente
+    rng = np.random.default_rng(seed)
+    channel = np.abs(rng.normal(scale=5.0, size=samples))
+
+    peaks = np.arange(500, samples - 500, 1000) + rng.integers(-200, 200)
+    window = np.arange(-60, 61)
+    impulse = 400.0 * np.exp(-(window**2) / (2 * 15.0**2))
+    channel[peaks[:, None] + window] += impulse
+
+    return channel, peaks
+
+
+def kernel_calls(channel: np.ndarray, seeds: np.ndarray) -> dict:
+    starts, ends = backend.runs(channel > 30.0)
+
+    return {
+        "climb_peaks": lambda: backend.climb_peaks(channel, seeds),
+        "peak_ranges": lambda: backend.peak_ranges(channel, seeds, 300.0),
+        "threshold_ranges": lambda: backend.threshold_ranges(channel, seeds, 30.0),
+        "descend_slopes": lambda: backend.descend_slopes(channel, starts, ends - 1),
+    }
+
+
+def random_case(rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+    # Canal corto con valores repetidos (mesetas) y semillas en los extremos
+    samples = int(rng.integers(3, 200))
+    channel = rng.integers(0, 8, samples).astype(np.float64) * 50.0
+    seeds = np.concatenate(
+        ([0, samples - 1], rng.integers(0, samples, int(rng.integers(1, 20))))
+    )
+    return channel, seeds
+
+
+def check_random_cases(backends: list[str], cases: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    previous = backend.get_backend()
+    try:
+        for case in range(cases):
+            calls = kernel_calls(*random_case(rng))
+            results = {}
+            for backend_name in backends:
+                backend.set_backend(backend_name)
+                results[backend_name] = {name: call() for name, call in calls.items()}
+
+            reference = results[backend.REFERENCE]
+            for backend_name, result in results.items():
+                for name in calls:
+                    if not same(result[name], reference[name]):
+                        raise AssertionError(
+                            f"{name} differs from the reference loop with the "
+                            f"{backend_name} backend (random case {case})"
+                        )
+    finally:
+        backend.set_backend(previous)
+
+
+def timeit(call, repeat: int) -> float:
+    call()  # Warm up (JIT compilation)
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        call()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def same(a, b) -> bool:
+    if isinstance(a, tuple):
+        return all(np.array_equal(x, y) for x, y in zip(a, b))
+    return np.array_equal(a, b)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=3_600_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cases", type=int, default=1000)
+    args = parser.parse_args()
+
+    backends = backend.available_backends()
+    check_random_cases(backends, args.cases)
+    print(f"{args.cases} random cases match the reference loops")
+
+    channel, peaks = velocity_profile(args.samples)
+    seeds = peaks + np.random.default_rng(1).integers(-20, 20, len(peaks))
+    calls = kernel_calls(channel, seeds)
+
+    previous = backend.get_backend()
+
+    references = {}
+    timings = {name: {} for name in calls}
+    for backend_name in backends:
+        backend.set_backend(backend_name)
+        for name, call in calls.items():
+            result = call()
+            if backend_name == backend.REFERENCE:
+                references[name] = result
+            elif not same(result, references[name]):
+                raise AssertionError(f"{name} differs with the {backend_name} backend")
+
+            timings[name][backend_name] = timeit(call, args.repeat)
+
+    backend.set_backend(previous)
+
+    print(f"{args.samples} samples, {len(seeds)} seeds, best of {args.repeat}")
+    print()
+    header = f"{'kernel':<18}" + "".join(f"{name:>14}" for name in backends)
+    if len(backends) > 1:
+        header += f"{'speedup':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, times in timings.items():
+        row = f"{name:<18}" + "".join(f"{times[b] * 1000:>12.2f}ms" for b in backends)
+        if len(backends) > 1:
+            row += f"{times[backends[0]] / times[backends[-1]]:>9.0f}x"
+        print(row)
@@ -0,0 +1,65 @@
+#!env python
+"""Compare the pursuit latency estimators of PursuitBiomarkers
+
+For every pursuit test of the given studies (the sample recordings of
+notebooks/data by default) prints the latency mean, std, number of cycles and
+run time of the CWT peaks estimator and of the cross-correlation estimator.
+"""
+
+from argparse import ArgumentParser
+from pathlib import Path
+from time import perf_counter
+
+from openeog.core.biomarkers import PursuitBiomarkers
+from openeog.core.io import load_study
+from openeog.core.models import TestType
+
+DATA_PATH = Path(__file__).parent.parent / "notebooks" / "data"
+
+METHODS = ["peaks", "xcorr"]
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "studies",
+        nargs="*",
+        default=sorted(str(path) for path in DATA_PATH.glob("*persecucion.bsp")),
+    )
+    args = parser.parse_args()
+
+    header = "{:<32}{:>8}{:>8}{:>10}{:>10}{:>12}".format(
+        "study", "method", "cycles", "mean (s)", "std (s)", "time (ms)"
+    )
+    print(header)
+    print("-" * len(header))
+
+    for filename in args.studies:
+        study = load_study(filename)
+        for test in study:
+            if test.test_type != TestType.HorizontalPursuit:
+                continue
+
+            for method in METHODS:
+                biomarkers = PursuitBiomarkers(test, latency_method=method)
+
+                start = perf_counter()
+                try:
+                    latencies = biomarkers.cycle_latencies
+                    mean = biomarkers.latency_mean
+                    std = biomarkers.latency_std
+                except ValueError as error:
+                    print(f"{Path(filename).stem:<32}{method:>8}  {error}")
+                    continue
+                elapsed = (perf_counter() - start) * 1000.0
+
+                print(
+                    "{:<32}{:>8}{:>8}{:>10.3f}{:>10.3f}{:>12.1f}".format(
+                        Path(filename).stem,
+                        method,
+                        len(latencies),
+                        mean,
+                        std,
+                        elapsed,
+                    )
+                )
@@ -0,0 +1,80 @@
+#!env python
+"""Compare the fused velocity kernel with the two-stage velocity
+
+For every test of the given studies (the sample recordings of notebooks/data by
+default) prints the maximum error of ``velocity`` with respect to
+``differentiate(denoise_35(channel))`` relative to the peak velocity, both away
+from the edges (first and last second) and over the whole channel, and the run
+time of both paths. A Savitzky-Golay derivative is included as a reference of a
+smoothing differentiator that does not reproduce the current filter.
+"""
+
+from argparse import ArgumentParser
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+from scipy import signal
+
+from openeog.core.denoising import denoise_35
+from openeog.core.differentiation import differentiate, velocity
+from openeog.core.io import load_study
+
+DATA_PATH = Path(__file__).parent.parent / "notebooks" / "data"
+
+EDGE = 1000
+REPEATS = 5
+
+METHODS = {
+    "fused": velocity,
+    "savgol": lambda channel: signal.savgol_filter(channel, 51, 3, deriv=1) * 1000.0,
+}
+
+
+def timed(function, channel):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = perf_counter()
+        result = function(channel)
+        best = min(best, perf_counter() - start)
+    return result, best * 1000.0
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "studies",
+        nargs="*",
+        default=sorted(str(path) for path in DATA_PATH.glob("*.bsp")),
+    )
+    args = parser.parse_args()
+
+    header = "{:<32}{:>8}{:>12}{:>12}{:>12}{:>12}".format(
+        "study", "method", "interior", "whole", "time (ms)", "two-stage"
+    )
+    print(header)
+    print("-" * len(header))
+
+    for filename in args.studies:
+        study = load_study(filename)
+        for test in study:
+            channel = np.asarray(test.hor_channel, dtype=np.float64)
+            reference, reference_time = timed(
+                lambda channel: differentiate(denoise_35(channel)),
+                channel,
+            )
+            scale = abs(reference).max()
+
+            for name, method in METHODS.items():
+                result, elapsed = timed(method, channel)
+                error = abs(result - reference) / scale
+                print(
+                    "{:<32}{:>8}{:>12.2e}{:>12.2e}{:>12.2f}{:>12.2f}".format(
+                        Path(filename).stem,
+                        name,
+                        error[EDGE:-EDGE].max(),
+                        error.max(),
+                        elapsed,
+                        reference_time,
+                    )
+                )
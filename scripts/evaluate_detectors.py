@@ -0,0 +1,68 @@
+#!env python
+"""Score the detectors against the hand labelled recordings
+
+Loads the studies of notebooks/data that have a labels spreadsheet next to
+them, runs a parameter grid search of every detector and prints precision,
+recall, F1, mean onset/offset errors and run time of every configuration, best
+first.
+"""
+
+from argparse import ArgumentParser
+from pathlib import Path
+
+from openeog.core.evaluation import grid_search, load_labelled_study
+
+DATA_PATH = Path(__file__).parent.parent / "notebooks" / "data"
+
+GRIDS = {
+    "saccades": {
+        "tolerance": [0.1, 0.2, 0.3, 0.4, 0.5],
+    },
+    "impulses": {},
+    "antisaccadic_impulses": {
+        "velocity_threshold": [10.0, 15.0, 20.0, 30.0, 50.0],
+        "duration_threshold": [5, 10, 15, 20],
+    },
+}
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("-t", "--tolerance", type=int, default=30)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("detectors", nargs="*", default=list(GRIDS))
+    args = parser.parse_args()
+
+    cases = []
+    for labels_path in sorted(DATA_PATH.glob("*.xlsx")):
+        study_path = labels_path.with_suffix(".bsp")
+        if study_path.exists():
+            cases += load_labelled_study(str(study_path), str(labels_path))
+
+    print(f"{len(cases)} labelled tests\n")
+
+    for detector in args.detectors:
+        print(detector)
+        header = "  {:<48}{:>7}{:>7}{:>7}{:>9}{:>9}{:>10}".format(
+            "parameters", "prec", "recall", "f1", "onset", "offset", "time (s)"
+        )
+        print(header)
+        for parameters, score, elapsed in grid_search(
+            detector,
+            GRIDS[detector],
+            cases,
+            args.tolerance,
+            args.workers,
+        ):
+            print(
+                "  {:<48}{:>7.3f}{:>7.3f}{:>7.3f}{:>9.1f}{:>9.1f}{:>10.2f}".format(
+                    str(parameters),
+                    score.precision,
+                    score.recall,
+                    score.f1,
+                    score.onset_error,
+                    score.offset_error,
+                    elapsed,
+                )
+            )
+        print()
@@ -4,8 +4,8 @@ from pathlib import Path
 
 from tqdm import tqdm
 
-from openeog.core.io import load_study, save_study
-from openeog.core.models import Study
+from openeog.core.extraction import extract
+from openeog.core.models import TestType
 
 BASE_PATH = "/Users/idertator/Registros/july2024"
 ANTISACCADIC_PATH = Path(BASE_PATH) / "antisaccades"
@@ -44,26 +44,18 @@ ANTISACCADIC_STUDIES = [
 OUTPUT_PATH = "antisaccades_biomarkers.xlsx"
 
 
-def process_study(study: Study, pursuit: bool = False):
-    pass
-
-
 if __name__ == "__main__":
-    ANTISACCADIC_OUTPUT_PATH = ANTISACCADIC_PATH / OUTPUT_PATH
-    if not ANTISACCADIC_OUTPUT_PATH.exists():
-        ANTISACCADIC_OUTPUT_PATH.mkdir(parents=True)
-
-    for filename in tqdm(
-        ANTISACCADIC_STUDIES,
-        desc="Processing antisaccadic studies",
-    ):
-        print(f"Processing study {filename}")
-        fullpath = ANTISACCADIC_PATH / filename
-        if fullpath.exists():
-            study = load_study(fullpath)
-            process_study(study)
-
-            output_path = ANTISACCADIC_OUTPUT_PATH / filename
-            save_study(study, output_path)
-
-        print()
+    filepaths = [
+        str(ANTISACCADIC_PATH / filename)
+        for filename in ANTISACCADIC_STUDIES
+        if (ANTISACCADIC_PATH / filename).exists()
+    ]
+
+    with tqdm(total=len(filepaths), desc="Processing antisaccadic studies") as progress:
+        for filepath, rows in extract(
+            filepaths,
+            str(ANTISACCADIC_PATH / OUTPUT_PATH),
+            TestType.HorizontalAntisaccadic,
+        ):
+            progress.set_postfix_str(f"{Path(filepath).name}: {rows} tests")
+            progress.update()
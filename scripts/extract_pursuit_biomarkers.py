@@ -4,8 +4,8 @@ from pathlib import Path
 
 from tqdm import tqdm
 
-from openeog.core.io import load_study, save_study
-from openeog.core.models import Study
+from openeog.core.extraction import extract
+from openeog.core.models import TestType
 
 BASE_PATH = "/Users/idertator/Registros/july2024"
 PURSUIT_PATH = Path(BASE_PATH) / "pursuits"
@@ -47,26 +47,16 @@ PURSUIT_STUDIES = [
 OUTPUT_PATH = "pursuits_biomarkers.xlsx"
 
 
-def process_study(study: Study, pursuit: bool = False):
-    pass
-
-
 if __name__ == "__main__":
-    PURSUIT_OUTPUT_PATH = PURSUIT_PATH / OUTPUT_PATH
-    if not PURSUIT_OUTPUT_PATH.exists():
-        PURSUIT_OUTPUT_PATH.mkdir(parents=True)
-
-    for filename in tqdm(
-        PURSUIT_STUDIES,
-        desc="Processing pursuit studies",
-    ):
-        print(f"Processing study {filename}")
-        fullpath = PURSUIT_PATH / filename
-        if fullpath.exists():
-            study = load_study(fullpath)
-            process_study(study, pursuit=True)
-
-            output_path = PURSUIT_OUTPUT_PATH / filename
-            save_study(study, output_path)
-
-        print()
+    filepaths = [
+        str(PURSUIT_PATH / filename)
+        for filename in PURSUIT_STUDIES
+        if (PURSUIT_PATH / filename).exists()
+    ]
+
+    with tqdm(total=len(filepaths), desc="Processing pursuit studies") as progress:
+        for filepath, rows in extract(
+            filepaths, str(PURSUIT_PATH / OUTPUT_PATH), TestType.HorizontalPursuit
+        ):
+            progress.set_postfix_str(f"{Path(filepath).name}: {rows} tests")
+            progress.update()
@@ -77,24 +77,25 @@ OUTPUT_PATH = "fixed"
 
 
 def fix_timing(test: Test, cut_samples: int):
-    test._hor_channel = test._hor_channel[cut_samples:]
-    test._hor_stimuli = test._hor_stimuli[:-cut_samples]
+    # openeog.core.alignment.align_test estima este desfase automáticamente
+    test.apply_shift(cut_samples)
 
 
 def clear_vertical_channel(test: Test):
-    length = len(test._hor_stimuli)
-    test._ver_channel = np.zeros(length)
-    test._ver_stimuli = np.zeros(length)
+    length = len(test.hor_stimuli_raw)
+    test.update(ver_stimuli=np.zeros(length), ver_channel=np.zeros(length))
 
 
 def denoise(test: Test):
-    test._hor_channel = denoise_35(test._hor_channel)
+    test.update(hor_channel=denoise_35(test.hor_channel_raw))
 
 
 def fix_test_diferences(test: Test):
-    length = len(test._hor_stimuli)
-    test._hor_channel = test._hor_channel[:length]
-    test._ver_channel = test._ver_channel[:length]
+    length = len(test.hor_stimuli_raw)
+    test.update(
+        hor_channel=test.hor_channel_raw[:length],
+        ver_channel=test.ver_channel_raw[:length],
+    )
 
 
 def process_study(study: Study, pursuit: bool = False):
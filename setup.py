@@ -28,6 +28,9 @@ setup(
         ]
     ),
     entry_points={
+        "console_scripts": [
+            "openeog-biomarkers = openeog.extractor:main",
+        ],
         "gui_scripts": [
             "openeog-recorder = openeog.recorder:main",
             "openeog-editor = openeog.editor:main",
@@ -66,6 +69,9 @@ setup(
         "termcolor",
         "pyserial",
     ],
+    extras_require={
+        "numba": ["numba"],
+    },
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Environment :: X11 Applications :: Qt",